@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import weakref
+
+# Domyślna maksymalna liczba jednocześnie wykonywanych blokujących odczytów
+DEFAULT_CONCURRENCY = 4
+
+
+class BlockingRunner:
+    """ Klasa wykonująca blokujące funkcje (odczyty z /proc) w puli wątków tak, by nie wstrzymywały pętli zdarzeń.
+        Liczba jednocześnie wykonywanych funkcji jest ograniczona semaforem, osobnym dla każdej pętli zdarzeń """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, executor=None):
+        """ Funkcja przyjmuje maksymalną liczbę jednoczesnych wywołań i pulę, domyślnie używana jest pula pętli zdarzeń """
+        self.concurrency = concurrency
+        self.executor = executor
+        self.semaphores = weakref.WeakKeyDictionary()
+
+    async def run(self, func, *args, **kwargs):
+        """ Funkcja wykonuje func(*args, **kwargs) w puli i zwraca wynik """
+        # asyncio jest importowane dopiero tutaj - kod synchroniczny korzystający z modułów processes i resources go nie potrzebuje
+        import asyncio
+        loop = asyncio.get_running_loop()
+
+        semaphore = self.semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self.semaphores[loop] = asyncio.Semaphore(self.concurrency)
+
+        async with semaphore:
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+
+# Wspólny obiekt używany przez asynchroniczne funkcje modułów processes i resources
+default_runner = BlockingRunner()
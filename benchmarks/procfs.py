@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+""" Porównanie kosztu odczytu i parsowania plików procesów z /proc na jeden proces.
+
+    Wersja tekstowa (open w trybie 'r', readline, split) to poprzednia implementacja czytników z processes.py,
+    przepisana tutaj jako punkt odniesienia. Wersja procfs korzysta z bieżących czytników opartych na os.preadv
+    i wielokrotnie używanym buforze. Plik stat mierzony jest dwa razy: pełny odczyt z parsowaniem oraz typowa
+    sytuacja w której plik się nie zmienił i wystarcza porównanie z poprzednią zawartością.
+    Na końcu porównywany jest odczyt systemowych plików otwieranych za każdym razem z plikami trzymanymi otwartymi
+    przez resources.ProcSampler, w tym odczyt tylko wybranych kluczy z /proc/meminfo, oraz obliczanie obciążenia
+    procesorów przez poprzednią wersję CpuTracker (listy słowników) i bieżącą (tablice) dla wygenerowanego pliku
+    /proc/stat maszyny z wieloma rdzeniami.
+
+    Użycie: python benchmarks/procfs.py [--repeat N]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+# Katalog z modułami programu
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import procfs
+import resources
+from processes import ProcessStat, STATM_KEYS, STAT_KEYS, STAT_EAGER_KEYS
+from history import MEMINFO_KEYS
+
+STAT_INDEXES = {key: index - 2 for index, key in enumerate(STAT_KEYS) if index >= 2}
+
+
+# Poprzednie czytniki tekstowe
+
+class TextStat:
+    """ Poprzednia postać ProcessStat parsująca linię tekstu """
+
+    __slots__ = ('line', 'pid', 'comm', 'state') + STAT_EAGER_KEYS
+
+    def __init__(self, line):
+        self.line = line
+        pstart, pend = line.find('('), line.rfind(')')
+        self.pid = int(line[:pstart])
+        self.comm = sys.intern(line[pstart+1:pend])
+        tokens = line[pend+2:].split()
+        self.state = tokens[0]
+        for key in STAT_EAGER_KEYS:
+            setattr(self, key, int(tokens[STAT_INDEXES[key]]))
+
+
+def text_stat(pid):
+    with open('/proc/%d/stat' % pid, 'r') as file:
+        return TextStat(file.readline())
+
+
+def text_stat_unchanged(pid, previous):
+    with open('/proc/%d/stat' % pid, 'r') as file:
+        return file.readline() == previous
+
+
+def text_statm(pid):
+    with open('/proc/%d/statm' % pid, 'r') as file:
+        content = file.readline().strip()
+    return dict(zip(STATM_KEYS, [int(token) for token in content.split(' ')]))
+
+
+def text_io(pid):
+    io_stats = {}
+    with open('/proc/%d/io' % pid, 'r') as file:
+        for line in file.readlines():
+            key, value = line.strip().split(':')
+            io_stats[key] = int(value)
+    return io_stats
+
+
+def text_status(pid):
+    status = {}
+    with open('/proc/%d/status' % pid, 'r') as file:
+        for line in file:
+            key, _, value = line.partition(':')
+            status[key] = value.strip()
+    return status
+
+
+def text_cpus_times(content):
+    """ Poprzednie parsowanie /proc/stat do listy słowników """
+    cpus = []
+    end = content.find(b'\nintr')
+    for line in content[:end].splitlines():
+        if not line.startswith(b'cpu'):
+            break
+        cpus.append(dict(zip(resources.STAT_CPU_KEYS, [int(token) for token in line.split()[1:]])))
+    return cpus
+
+
+def text_cpu_loads(previous_times, current_times):
+    """ Poprzednie obliczanie obciążeń z CpuTracker.update_with """
+    cpus = []
+    for cpu in range(len(current_times)):
+        previous_total = sum(previous_times[cpu].values())
+        current_total = sum(current_times[cpu].values())
+        loads = {}
+        for key in current_times[cpu]:
+            loads[key] = (current_times[cpu][key] - previous_times[cpu][key]) / (current_total - previous_total)
+        loads['load'] = 1 - loads['idle']
+        cpus.append(loads)
+    return cpus
+
+
+def synthetic_stat(cpus, step):
+    """ Zwraca zawartość /proc/stat maszyny z podaną liczbą procesorów, liczniki rosną z każdym krokiem """
+    generator = random.Random(step)
+    rows = [[step * 1000 + generator.randrange(1000) for _ in resources.STAT_CPU_KEYS] for _ in range(cpus)]
+    total = [sum(column) for column in zip(*rows)]
+    lines = [b'cpu  ' + b' '.join(b'%d' % value for value in total)]
+    lines += [b'cpu%d ' % cpu + b' '.join(b'%d' % value for value in row) for cpu, row in enumerate(rows)]
+    return b'\n'.join(lines) + b'\nintr 0\nctxt 0\n'
+
+
+# Czytniki procfs w postaci używanej przez processes.Process
+
+def procfs_stat(pid):
+    content = procfs.reader().read('/proc/%d/stat' % pid, single=True)
+    return ProcessStat(bytes(content))
+
+
+def procfs_stat_unchanged(pid, previous):
+    return previous.matches(procfs.reader().read('/proc/%d/stat' % pid, single=True))
+
+
+def procfs_statm(pid):
+    content = procfs.reader().read('/proc/%d/statm' % pid, single=True)
+    return dict(zip(STATM_KEYS, procfs.parse_ints(bytes(content))))
+
+
+def procfs_io(pid):
+    return procfs.parse_key_values(bytes(procfs.reader().read('/proc/%d/io' % pid, single=True)))
+
+
+def procfs_status(pid):
+    status = {}
+    for line in bytes(procfs.reader().read('/proc/%d/status' % pid)).decode('utf-8', 'replace').splitlines():
+        key, _, value = line.partition(':')
+        status[key] = value.strip()
+    return status
+
+
+def readable_pids(name):
+    """ Zwraca procesy których plik można odczytać """
+    pids = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open('/proc/%s/%s' % (entry, name), 'rb') as file:
+                    file.read()
+                pids.append(int(entry))
+            except OSError:
+                pass
+    return pids
+
+
+def measure(function, pids, repeat, *args):
+    """ Zwraca najlepszy z repeat czasów wywołania funkcji dla wszystkich procesów, w mikrosekundach na proces """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for pid, *extra in zip(pids, *args):
+            try:
+                function(pid, *extra)
+            except (FileNotFoundError, ProcessLookupError):
+                pass
+        best = min(best, time.perf_counter() - start)
+    return best / len(pids) * 1e6
+
+
+def measure_call(function, repeat, calls=200):
+    """ Zwraca najlepszy z repeat czasów wywołania funkcji bez argumentów, w mikrosekundach na wywołanie """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-process /proc parsing cost: text readers vs procfs')
+    parser.add_argument('--repeat', type=int, default=20, help='number of passes, the best is reported (default: %(default)s)')
+    args = parser.parse_args()
+
+    print('%-16s %10s %10s %8s' % ('file', 'text [us]', 'procfs [us]', 'speedup'))
+    for name, text, fast in (('stat', text_stat, procfs_stat), ('statm', text_statm, procfs_statm),
+                             ('io', text_io, procfs_io), ('status', text_status, procfs_status)):
+        pids = readable_pids(name)
+        text_time, fast_time = measure(text, pids, args.repeat), measure(fast, pids, args.repeat)
+        print('%-16s %10.2f %10.2f %7.2fx' % (name, text_time, fast_time, text_time / fast_time))
+
+    # Typowy przypadek - plik stat się nie zmienił
+    pids = readable_pids('stat')
+    text_lines = [text_stat(pid).line for pid in pids]
+    stats = [procfs_stat(pid) for pid in pids]
+    text_time = measure(text_stat_unchanged, pids, args.repeat, text_lines)
+    fast_time = measure(procfs_stat_unchanged, pids, args.repeat, stats)
+    print('%-16s %10.2f %10.2f %7.2fx' % ('stat unchanged', text_time, fast_time, text_time / fast_time))
+    print('processes: %d' % len(pids))
+
+    # Pliki systemowe - otwierane przy każdym odczycie i trzymane otwarte
+    sampler = resources.ProcSampler()
+    print('\n%-24s %10s %10s %8s' % ('system file', 'open [us]', 'kept [us]', 'speedup'))
+    for name, reopen, kept in (('stat', resources.get_cpus_times, sampler.get_cpus_times),
+                               ('meminfo', resources.get_memory_info, sampler.get_memory_info),
+                               ('meminfo (history keys)', lambda: resources.get_memory_info(MEMINFO_KEYS),
+                                lambda: sampler.get_memory_info(MEMINFO_KEYS)),
+                               ('loadavg', resources.get_avgload, sampler.get_avgload)):
+        reopen_time, kept_time = measure_call(reopen, args.repeat), measure_call(kept, args.repeat)
+        print('%-24s %10.2f %10.2f %7.2fx' % (name, reopen_time, kept_time, reopen_time / kept_time))
+    sampler.close()
+
+    # Obciążenie procesorów z dwóch kolejnych odczytów /proc/stat
+    print('\n%-24s %10s %10s %8s' % ('cpu loads', 'dicts [us]', 'array [us]', 'speedup'))
+    for cpus in (8, 64, 256):
+        first, second = synthetic_stat(cpus, 1), synthetic_stat(cpus, 2)
+        previous, previous_array = text_cpus_times(first), resources.parse_cpus_times(first)
+        tracker = resources.CpuTracker()
+
+        def array_loads():
+            tracker.previous_times = previous_array
+            return tracker.update_with(resources.parse_cpus_times(second))
+
+        text_time = measure_call(lambda: text_cpu_loads(previous, text_cpus_times(second)), args.repeat, 20)
+        array_time = measure_call(array_loads, args.repeat, 20)
+        print('%-24s %10.2f %10.2f %7.2fx' % ('%d cpus' % cpus, text_time, array_time, text_time / array_time))
+
+
+if __name__ == '__main__':
+    main()
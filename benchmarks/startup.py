@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+""" Pomiar czasu importu modułów przy zimnym starcie interpretera.
+
+    Każdy moduł importowany jest w osobnym, nowym procesie, mierzony jest sam import (bez startu interpretera).
+    Moduły rdzenia nie mogą importować Qt. Program kończy się kodem 1, gdy któryś moduł przekroczy budżet.
+
+    Użycie: python benchmarks/startup.py [--repeat N]
+"""
+
+import os
+import sys
+import json
+import argparse
+import compileall
+import statistics
+import subprocess
+
+# Katalog z modułami programu
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budżety czasu importu w milisekundach oraz informacja czy moduł może korzystać z Qt
+BUDGETS = (
+    ('processes', 30, False),
+    ('resources', 30, False),
+    ('scheduler', 30, False),
+    ('aio', 30, False),
+    ('disks', 30, False),
+    ('headless', 100, False),
+    ('snapshot', 300, False),
+    ('data', 1000, True),
+)
+
+# Kod wykonywany w procesie potomnym, wypisuje czas importu i listę załadowanych modułów Qt
+PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+import %s
+elapsed = time.perf_counter() - start
+qt = sorted(name for name in sys.modules if name.split('.')[0] in ('PySide2', 'PyQt5'))
+print(json.dumps({'elapsed': elapsed, 'qt': qt}))
+'''
+
+
+def measure(module, repeat):
+    """ Zwraca medianę czasu importu modułu w sekundach i listę załadowanych modułów Qt """
+    times = []
+    qt = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE % module], cwd=ROOT, check=True,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        times.append(result['elapsed'])
+        qt = result['qt']
+    return statistics.median(times), qt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cold import time of Task Manager modules')
+    parser.add_argument('--repeat', type=int, default=5, help='number of fresh interpreters per module')
+    args = parser.parse_args(argv)
+
+    # Pliki .pyc muszą być aktualne, inaczej mierzylibyśmy kompilację
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+
+    failed = False
+    print('%-12s %10s %10s  %s' % ('module', 'time [ms]', 'budget', 'status'))
+    for module, budget, qt_allowed in BUDGETS:
+        elapsed, qt = measure(module, args.repeat)
+        elapsed *= 1000
+        problems = []
+        if elapsed > budget:
+            problems.append('over budget')
+        if qt and not qt_allowed:
+            problems.append('imports Qt: ' + ', '.join(qt[:3]))
+        failed = failed or bool(problems)
+        print('%-12s %10.1f %10d  %s' % (module, elapsed, budget, '; '.join(problems) or 'ok'))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+from PySide2.QtWidgets import *
+from PySide2.QtCore import *
+from PySide2.QtGui import QPainter, QPixmap, QColor, QPen
+
+
+class HistoryChart(QWidget):
+    """ Wykres historii z bufora cyklicznego history.RingBuffer rysowany na mapie pikseli. Nowe próbki przesuwają mapę
+        w lewo i rysowane są tylko ich kolumny, więc koszt odświeżenia nie zależy od długości historii. Wykres pamięta
+        licznik bufora z ostatniego rysowania, więc może dorysować wszystkie próbki które ominął będąc niewidocznym.
+        Podklasy rysują próbki w _draw_samples i mogą zmienić opis w label """
+
+    # Szerokość jednej próbki w pikselach
+    SAMPLE_WIDTH = 1
+
+    BACKGROUND_COLOR = QColor(Qt.white)
+    TEXT_COLOR = QColor(Qt.black)
+
+    def __init__(self, title, samples, index=(), height=50):
+        """ Wykres rysuje część index każdej próbki z bufora samples """
+        # Metaklasa Qt nie łączy się z ABCMeta, więc brak _draw_samples w podklasie sprawdzamy tutaj, a nie przy rysowaniu
+        if type(self)._draw_samples is HistoryChart._draw_samples:
+            raise TypeError("%s does not implement _draw_samples" % type(self).__name__)
+        QWidget.__init__(self)
+        self.title = title
+        self.samples = samples
+        self.index = index
+        self.chart_height = height
+        self.last_sample = None
+        self.pixmap = None
+        self.sequence = 0
+
+        self.setMinimumSize(100, height)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+    def set_samples(self, samples):
+        """ Funkcja zmienia bufor z którego rysowany jest wykres i rysuje go od nowa """
+        self.samples = samples
+        self.redraw()
+
+    def catch_up(self):
+        """ Funkcja dorysowuje próbki dopisane do bufora od poprzedniego rysowania """
+        if self.pixmap is not None and self.sequence != self.samples.sequence:
+            self._pull_samples()
+            self.update()
+
+    def redraw(self):
+        """ Funkcja rysuje wykres od nowa z próbek zapamiętanych w buforze """
+        self.pixmap = QPixmap(max(1, self.width()), self.chart_height)
+        self.pixmap.fill(self.BACKGROUND_COLOR)
+        self.sequence = 0
+        self.last_sample = None
+        self.catch_up()
+
+    def label(self):
+        """ Opis wyświetlany w rogu wykresu """
+        return self.title
+
+    def resizeEvent(self, event):
+        QWidget.resizeEvent(self, event)
+        self.redraw()
+
+    def paintEvent(self, event):
+        if self.pixmap is None:
+            return
+
+        # Wykres mógł ominąć próbki gdy był niewidoczny
+        if self.sequence != self.samples.sequence:
+            self._pull_samples()
+
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.pixmap)
+        painter.setPen(self.TEXT_COLOR)
+        painter.drawText(4, 14, self.label())
+        painter.end()
+
+    def _pull_samples(self):
+        """ Funkcja pobiera z bufora nowe próbki, ale nie więcej niż mieści się na wykresie, i dorysowuje je """
+        width = self.pixmap.width()
+        self.sequence, samples = self.samples.since(self.sequence, width // self.SAMPLE_WIDTH, self.index)
+        if not len(samples):
+            return
+
+        shift = len(samples) * self.SAMPLE_WIDTH
+        if shift < width:
+            self.pixmap.scroll(-shift, 0, self.pixmap.rect())
+        else:
+            self.last_sample = None
+
+        painter = QPainter(self.pixmap)
+        painter.fillRect(width - shift, 0, shift, self.chart_height, self.BACKGROUND_COLOR)
+        self._draw_samples(painter, width - shift, samples.tolist())
+        painter.end()
+
+        self.last_sample = samples[-1].tolist()
+
+    def _draw_samples(self, painter, x, samples):
+        """ Rysuje listę próbek od kolumny x, musi zostać zdefiniowana w podklasie """
+
+
+class StackedChart(HistoryChart):
+    """ Wykres słupkowy - dla każdej próbki słupek z wartości ułożonych jedna na drugiej. Wartości to ułamki od 0 do 1,
+        series to lista par (indeks w próbce, kolor). Wartość total, jeśli podana, jest dopełniana kolorem rest_color """
+
+    def __init__(self, title, samples, index, series, total=None, rest_color=None, height=50):
+        HistoryChart.__init__(self, title, samples, index, height)
+        self.series = series
+        self.total = total
+        self.rest_color = rest_color
+
+    def _draw_samples(self, painter, x, samples):
+        height = self.chart_height
+        for sample in samples:
+            bottom = height
+            for index, color in self.series:
+                bar = int(round(sample[index] * height))
+                if bar > 0:
+                    painter.fillRect(x, bottom - bar, self.SAMPLE_WIDTH, bar, color)
+                    bottom -= bar
+
+            # Pozostała część wartości total nie należąca do żadnej z serii
+            if self.total is not None:
+                rest = int(round(sample[self.total] * height)) - (height - bottom)
+                if rest > 0:
+                    painter.fillRect(x, bottom - rest, self.SAMPLE_WIDTH, rest, self.rest_color)
+            x += self.SAMPLE_WIDTH
+
+
+class LineChart(HistoryChart):
+    """ Wykres liniowy - series to lista par (indeks w próbce, kolor). Wartości są skalowane względem wartości
+        o indeksie scale w tej samej próbce, np. pamięci całkowitej. Kolejne punkty łączone są odcinkami,
+        więc wykres pamięta ostatnią narysowaną próbkę """
+
+    def __init__(self, title, samples, index, series, scale, height=50):
+        HistoryChart.__init__(self, title, samples, index, height)
+        self.series = [(index, QPen(color, 1)) for index, color in series]
+        self.scale = scale
+
+    def _y(self, sample, index):
+        """ Położenie wartości na wykresie """
+        scale = sample[self.scale]
+        fraction = sample[index] / scale if scale > 0 else 0.0
+        return int(round((1 - min(max(fraction, 0.0), 1.0)) * (self.chart_height - 1)))
+
+    def _draw_samples(self, painter, x, samples):
+        previous = self.last_sample
+        for sample in samples:
+            for index, pen in self.series:
+                painter.setPen(pen)
+                y = self._y(sample, index)
+                if previous is not None:
+                    painter.drawLine(x - self.SAMPLE_WIDTH, self._y(previous, index), x, y)
+                else:
+                    painter.drawPoint(x, y)
+            previous = sample
+            x += self.SAMPLE_WIDTH
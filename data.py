@@ -1,27 +1,75 @@
 # -*- coding: utf-8 -*-
 
 import math
-from PyQt5.QtCore import pyqtSignal
-from PySide2.QtCore import *
-from processes import *
-from resources import *
+import heapq
+from PySide2.QtCore import QObject, Signal
+from processes import Processes
+from resources import CpuTracker, ProcSampler
+from snapshot import PAGE_SIZE, ProcessCpuTracker, ProcessIoTracker, ProcessesSnapshot, SnapshotMailbox
+from history import CpuHistory, MemoryHistory, DiskHistory, MEMINFO_KEYS
+from disks import DiskTracker, MountTable, get_disks_stats
 
 
 class DataPack(QObject):
-    """ Klasa przechowująca informacje na temat procesów i zasobów z których korzysta gui """
+    """ Klasa przechowująca informacje na temat procesów i zasobów z których korzysta gui.
+        Funkcje update_* są wywoływane przez jeden wątek roboczy (Scheduler), każda z własnym okresem,
+        a gui dostaje niezmienne migawki procesów przez skrzynkę processes_mailbox """
 
     cpu_load_changed = Signal(int)
+    cpu_history_changed = Signal()
     ram_space_changed = Signal(int)
-    processes_changed = Signal(object)
+    memory_history_changed = Signal()
+    memory_top_changed = Signal()
+    disks_changed = Signal()
+    processes_changed = Signal()
+
+    # Liczba procesów w zestawieniu zajętości pamięci
+    MEMORY_TOP_COUNT = 20
 
     def __init__(self):
         """ Konstruktor xd """
         QObject.__init__(self)
 
         self.cpu_tracker = CpuTracker()
+        self.cpu_times = None
         self.cpu_loads = None
+        self.cpu_history = CpuHistory()
         self.memory_info = None
+        self.memory_history = MemoryHistory()
+        self.memory_top = ()
+        self.disk_tracker = DiskTracker()
+        self.disks = ({}, {}, {})
+        self.disk_history = DiskHistory()
+        self.mount_table = MountTable()
         self.processes = Processes()
+        self.process_cpu_tracker = ProcessCpuTracker()
+        self.process_io_tracker = ProcessIoTracker()
+        self.processes_snapshot = None
+        self.processes_mailbox = SnapshotMailbox()
+
+        # Źródło danych - domyślnie pliki /proc trzymane otwarte, może zostać zastąpione odtwarzanym nagraniem
+        self.sampler = ProcSampler()
+        self.get_cpus_times = self.sampler.get_cpus_times
+        self.get_memory_info = self.sampler.get_memory_info
+
+        # Z /proc/meminfo odczytywane są tylko wartości potrzebne historii, w tym MemTotal i MemAvailable dla get_ram_percent_use
+        self.memory_keys = MEMINFO_KEYS
+        self.replay = None
+        self.recorder = None
+
+    def replay_from(self, replay):
+        """ Funkcja przełącza źródło danych na odtwarzane nagranie recording.Replay, wywoływana przed rozpoczęciem odświeżania """
+        self.replay = replay
+        self.get_cpus_times = replay.get_cpus_times
+        self.get_memory_info = replay.get_memory_info
+        self.processes = replay.create_processes()
+
+    def record_to(self, recorder):
+        """ Funkcja włącza zapis każdego stanu procesów, procesorów i pamięci przez recording.Recorder """
+        self.recorder = recorder
+
+        # Nagranie zawiera wszystkie wartości z /proc/meminfo
+        self.memory_keys = None
 
     def get_ram_percent_use(self):
         """ Zwraca procentową zajętość pamięci ram """
@@ -31,9 +79,16 @@ class DataPack(QObject):
 
     def update(self):
         """ Funkcja aktualizująca wszystkie dane w obiekcie """
+        self.update_cpu()
+        self.update_memory()
+        self.update_processes()
+
+    def update_cpu(self):
+        """ Funkcja aktualizuje obciążenie procesora """
 
         # Pobranie obciążenia procesora
-        new_cpu_loads = self.cpu_tracker.update()
+        self.cpu_times = self.get_cpus_times()
+        new_cpu_loads = self.cpu_tracker.update_with(self.cpu_times)
         if new_cpu_loads:
             self.cpu_loads = new_cpu_loads
 
@@ -41,17 +96,105 @@ class DataPack(QObject):
             value = math.ceil(self.cpu_loads[0]['load']*100)
             self.cpu_load_changed.emit(value)
 
-        # Pobranie stanu pamięci
-        self.memory_info = get_memory_info()
-        self.ram_space_changed.emit(self.get_ram_percent_use())
-
-        # aktualizacja procesów
-        self.processes.update()
-        self.processes_changed.emit(self.processes)
-
-
-# Dane na temat procesów i zasobów
-data = DataPack()
+            # Historia dla wykresów w zakładce processor
+            self.cpu_history.append(self.cpu_loads)
+            self.cpu_history_changed.emit()
 
+    def update_memory(self):
+        """ Funkcja aktualizuje stan pamięci """
 
+        # Pobranie stanu pamięci
+        self.memory_info = self.get_memory_info(self.memory_keys)
+        self.ram_space_changed.emit(self.get_ram_percent_use())
 
+        # Historia dla wykresów w zakładce memory
+        self.memory_history.append(self.memory_info)
+        self.memory_history_changed.emit()
+
+    def update_memory_top(self):
+        """ Funkcja wyznacza procesy zajmujące najwięcej pamięci w ostatniej migawce. Kopiec wybiera MEMORY_TOP_COUNT
+            procesów o największym RSS bez sortowania wszystkich, a kosztowny odczyt PSS wykonywany jest tylko dla nich.
+            Wynik to krotka wierszy (pid, nazwa, rss, pss), pamięć w bajtach, pss to None gdy nie można go odczytać """
+        snapshot = self.processes_snapshot
+        if snapshot is None:
+            return
+
+        top = heapq.nlargest(self.MEMORY_TOP_COUNT, snapshot.by_pid.values(), key=lambda record: record.stat.rss)
+        rows = []
+        for record in top:
+            pss = None
+
+            # Odtwarzane procesy nie istnieją w /proc
+            if self.replay is None:
+                try:
+                    pss = record.read_smaps_rollup().get('Pss')
+                except (FileNotFoundError, ProcessLookupError, PermissionError):
+                    pass
+
+            rows.append((record.pid, record.stat.comm, record.stat.rss * PAGE_SIZE, pss * 1024 if pss is not None else None))
+
+        # Gui odczytuje zawsze całą krotkę, więc wystarczy podmienić referencję
+        self.memory_top = tuple(rows)
+        self.memory_top_changed.emit()
+
+    def update_disks(self):
+        """ Funkcja aktualizuje obciążenie dysków i ich punkty montowania """
+
+        # Nagrania nie zawierają statystyk dysków
+        if self.replay is not None:
+            return
+
+        stats = get_disks_stats()
+        rates = self.disk_tracker.update_with(stats)
+        self.mount_table.refresh()
+        if rates is None:
+            return
+
+        # Statystyki, punkty montowania i przepustowości są podmieniane jedną krotką (stats, mounts, rates),
+        # więc gui zawsze odczytuje słowniki z tego samego odczytu
+        mounts = {name: self.mount_table.mount_points_of(name, stats[name]['major'], stats[name]['minor']) for name in rates}
+
+        # Historia dla wykresów w zakładce discs, dopisywana przed podmianą słowników by nie była starsza od nich
+        self.disk_history.append(rates)
+        self.disks = (stats, mounts, rates)
+        self.disks_changed.emit()
+
+    def update_processes(self):
+        """ Funkcja aktualizuje procesy, wolno odświeżane dane procesów są zachowywane """
+        self._update_processes(self.processes.plan)
+
+    def update_slow_process_fields(self):
+        """ Funkcja aktualizuje procesy odczytując również wolno odświeżane dane, np. oom_score """
+        self._update_processes(self.processes.plan.refreshing_all())
+
+    def _update_processes(self, plan):
+        """ Funkcja aktualizuje procesy według podanego planu i przekazuje migawkę do gui """
+
+        # Nagranie wymaga właściciela procesów
+        if self.recorder is not None:
+            plan = plan.union(self.recorder.PLAN)
+
+        # aktualizacja procesów i obliczenie zużycia procesora i pamięci przez każdy z nich
+        self.processes.update(plan)
+        with_io = 'io' in plan
+        table = self.processes.to_table(with_owner=self.recorder is not None, with_io=with_io)
+
+        # Przy odtwarzaniu zużycie procesora liczone jest według czasu zapisanego w nagraniu
+        timestamp = self.replay.timestamp if self.replay is not None else None
+        if timestamp is not None and timestamp == self.process_cpu_tracker.previous_time:
+            return
+        usage = self.process_cpu_tracker.update(table, timestamp).by_pid()
+
+        # Liczniki io śledzone są tylko gdy są zbierane, po przerwie śledzenie zaczyna się od nowa
+        io = None
+        if with_io:
+            io = self.process_io_tracker.update(table, timestamp).by_pid()
+        else:
+            self.process_io_tracker.reset()
+        if self.recorder is not None:
+            self.recorder.record(table, self.cpu_times, self.memory_info)
+
+        # Gui dostaje niezmienną migawkę, jeśli nie odebrało poprzedniej to zostanie ona zastąpiona tą nową
+        self.processes_snapshot = ProcessesSnapshot.build(self.processes, self.processes_snapshot, usage, io)
+        if self.processes_mailbox.put(self.processes_snapshot):
+            self.processes_changed.emit()
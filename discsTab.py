@@ -0,0 +1,133 @@
+from PySide2.QtWidgets import *
+from PySide2.QtCore import *
+from PySide2.QtGui import QColor
+from disks import DISK_RATE_KEYS
+from charts import StackedChart
+from resources import convert_bytes_to_readable_form
+from tableModel import RowsTableModel
+
+
+class DiscsTab(QWidget):
+    """ Zakładka discs - tabela obciążenia urządzeń blokowych i wykresy historii ich zajętości.
+        Pokazywane są tylko urządzenia które wykonały jakąś operację od startu systemu lub są zamontowane """
+
+    UTILIZATION_COLOR = QColor(0, 130, 200)
+
+    def __init__(self, data):
+        """ Dodawanie komponentów do zakładki, dane pochodzą z obiektu DataPack """
+        QWidget.__init__(self)
+        self.data = data
+
+        self.layout = QVBoxLayout()
+        self.layout.setMargin(0)
+        self.setLayout(self.layout)
+
+        # Tabela urządzeń, sortowana przez model pośredni
+        self.model = DisksModel()
+        self.proxy = QSortFilterProxyModel()
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setSortRole(Qt.UserRole)
+        self.proxy.setDynamicSortFilter(True)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.proxy)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.sortByColumn(0, Qt.AscendingOrder)
+        self.table_view.verticalHeader().hide()
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.layout.addWidget(self.table_view)
+
+        # Wykresy w przewijanym obszarze
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.layout.addWidget(self.scroll_area)
+        self.charts_widget = QWidget()
+        self.charts_layout = QVBoxLayout()
+        self.charts_layout.addStretch()
+        self.charts_widget.setLayout(self.charts_layout)
+        self.scroll_area.setWidget(self.charts_widget)
+
+        self.charts = []
+        self.samples = None
+        self.devices = ()
+
+        self.data.disks_changed.connect(self.refresh, Qt.QueuedConnection)
+
+    @Slot()
+    def refresh(self):
+        """ Odświeżenie tabeli i dorysowanie nowych próbek na widocznych wykresach """
+        stats, mounts, rates = self.data.disks
+        devices = tuple(name for name in rates
+                        if mounts[name] or stats[name].get('reads', 0) + stats[name].get('writes', 0) > 0)
+
+        rows = [(name, ' '.join(mounts[name])) + tuple(rates[name][key] for key in DISK_RATE_KEYS) for name in devices]
+        self.model.set_rows(rows)
+
+        names, samples = self.data.disk_history.current
+        if samples is not self.samples or devices != self.devices:
+            self._create_charts(names, samples, devices)
+        if not self.isVisible():
+            return
+
+        for chart in self.charts:
+            if not chart.visibleRegion().isEmpty():
+                chart.catch_up()
+
+    def _create_charts(self, names, samples, devices):
+        """ Tworzy wykresy dla nowego bufora historii lub zmienionego zbioru pokazywanych urządzeń. Urządzenia
+            których jeszcze nie ma w historii dostaną wykres gdy pojawi się dla nich nowy bufor """
+        for chart in self.charts:
+            self.charts_layout.removeWidget(chart)
+            chart.deleteLater()
+
+        self.samples = samples
+        self.devices = devices
+        rows = {name: row for row, name in enumerate(names)}
+        utilization = DISK_RATE_KEYS.index('utilization')
+
+        self.charts = []
+        for name in devices:
+            if name not in rows:
+                continue
+            chart = DiskChart(name, samples, rows[name], [(utilization, self.UTILIZATION_COLOR)])
+            self.charts.append(chart)
+            self.charts_layout.insertWidget(len(self.charts) - 1, chart)
+
+
+class DiskChart(StackedChart):
+    """ Wykres historii zajętości jednego urządzenia z przepustowością z ostatniej próbki w opisie """
+
+    def label(self):
+        if self.last_sample is None:
+            return self.title
+        sample = dict(zip(DISK_RATE_KEYS, self.last_sample))
+        return '%s  %.0f %%  read %s/s  write %s/s' % (self.title, sample['utilization'] * 100,
+                                                       convert_bytes_to_readable_form(sample['read_bytes']),
+                                                       convert_bytes_to_readable_form(sample['write_bytes']))
+
+
+class DisksModel(RowsTableModel):
+    """ Model tabeli urządzeń, wiersze to krotki (nazwa, punkty montowania, wartości DISK_RATE_KEYS) """
+
+    COLUMNS = ['Device', 'Mount Points', 'Read', 'Write', 'Read IOPS', 'Write IOPS', 'Queue', 'Utilization']
+
+    def _cell(self, row, column):
+        name, mounts, read_iops, write_iops, read_bytes, write_bytes, queue_depth, utilization = row
+
+        if column == 'Device':
+            return name, name
+        if column == 'Mount Points':
+            return mounts, mounts
+        if column == 'Read':
+            return convert_bytes_to_readable_form(read_bytes) + '/s', read_bytes
+        if column == 'Write':
+            return convert_bytes_to_readable_form(write_bytes) + '/s', write_bytes
+        if column == 'Read IOPS':
+            return '%.1f' % read_iops, read_iops
+        if column == 'Write IOPS':
+            return '%.1f' % write_iops, write_iops
+        if column == 'Queue':
+            return '%.2f' % queue_depth, queue_depth
+        if column == 'Utilization':
+            return '%.1f %%' % (utilization * 100), utilization
+        return '', None
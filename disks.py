@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import select
+from processes import parse_mountinfo
+
+# Nazwy pól z pliku proc/diskstats występujące po numerach i nazwie urządzenia, szczegóły w Documentation/admin-guide/iostats.rst.
+# Starsze jądra podają tylko 11 pierwszych pól, czasy są w milisekundach, sektory mają zawsze 512 bajtów
+DISKSTATS_KEYS = ('reads', 'reads_merged', 'sectors_read', 'read_time', 'writes', 'writes_merged', 'sectors_written',
+                  'write_time', 'in_flight', 'io_time', 'weighted_io_time', 'discards', 'discards_merged',
+                  'sectors_discarded', 'discard_time', 'flushes', 'flush_time')
+SECTOR_SIZE = 512
+
+# Wartości obliczane przez DiskTracker dla każdego urządzenia
+DISK_RATE_KEYS = ('read_iops', 'write_iops', 'read_bytes', 'write_bytes', 'queue_depth', 'utilization')
+
+
+def get_disks_stats():
+    """ Funkcja zwraca słownik nazwa urządzenia: słownik ze statystykami z pliku /proc/diskstats,
+        numery urządzenia zapisane są pod kluczami major i minor """
+
+    disks = {}
+
+    with open('/proc/diskstats', 'r') as file:
+        for line in file.readlines():
+            tokens = line.split()
+            stats = dict(zip(DISKSTATS_KEYS, [int(token) for token in tokens[3:]]))
+            stats['major'] = int(tokens[0])
+            stats['minor'] = int(tokens[1])
+            disks[tokens[2]] = stats
+
+    return disks
+
+
+class DiskTracker:
+    """ Klasa śledząca obciążenie dysków - tak jak CpuTracker oblicza wartości z przyrostów liczników pomiędzy
+        kolejnymi odczytami, dodatkowo dzieląc je przez czas który upłynął """
+
+    def __init__(self):
+        """ Konstruktor obiektu śledzącego obciążenie dysków """
+        self.previous_stats = None
+        self.previous_time = None
+
+    def update(self):
+        """ Funkcja odczytuje statystyki dysków, oblicza obciążenia jeśli już może i je zwraca """
+        return self.update_with(get_disks_stats())
+
+    def update_with(self, current_stats, timestamp=None):
+        """ Funkcja oblicza obciążenia na podstawie statystyk odczytanych przez get_disks_stats. Zwraca słownik
+            nazwa urządzenia: słownik z wartościami DISK_RATE_KEYS, urządzenia które pojawiły się od poprzedniego
+            odczytu są pomijane. Czas odczytu w sekundach, domyślnie bieżący """
+        timestamp = timestamp if timestamp is not None else time.monotonic()
+
+        # Sprawdzenie czy można obliczyć obciążenia
+        if self.previous_stats is None or timestamp <= self.previous_time:
+            self.previous_stats = current_stats
+            self.previous_time = timestamp
+            return None
+
+        elapsed = timestamp - self.previous_time
+        disks = {}
+
+        for name, current in current_stats.items():
+            previous = self.previous_stats.get(name)
+            if previous is None:
+                continue
+
+            # Liczniki mogą się przekręcić (32 bity na starszych jądrach), wtedy przyrost traktujemy jako zerowy
+            def delta(key):
+                return max(current.get(key, 0) - previous.get(key, 0), 0)
+
+            disks[name] = {
+                'read_iops': delta('reads') / elapsed,
+                'write_iops': delta('writes') / elapsed,
+                'read_bytes': delta('sectors_read') * SECTOR_SIZE / elapsed,
+                'write_bytes': delta('sectors_written') * SECTOR_SIZE / elapsed,
+                # Średnia liczba oczekujących żądań (aqu-sz w iostat) i ułamek czasu w którym urządzenie było zajęte
+                'queue_depth': delta('weighted_io_time') / (elapsed * 1000),
+                'utilization': min(delta('io_time') / (elapsed * 1000), 1.0),
+            }
+
+        self.previous_stats = current_stats
+        self.previous_time = timestamp
+        return disks
+
+
+class MountTable:
+    """ Punkty montowania systemu z pliku /proc/self/mountinfo, przetwarzane ponownie tylko po zmianie.
+        Plik pozostaje otwarty, a jądro zgłasza zmianę tablicy montowania zdarzeniem POLLPRI na jego deskryptorze """
+
+    MOUNTINFO_PATH = '/proc/self/mountinfo'
+
+    def __init__(self):
+        """ Plik otwierany jest przy pierwszym odczycie """
+        self.file = None
+        self.poll = None
+        self.mount_points = ()
+        self.by_device = {}
+
+    def __repr__(self):
+        return "MountTable[mount points: %d]" % len(self.mount_points)
+
+    def refresh(self):
+        """ Funkcja przetwarza plik ponownie jeśli tablica montowania zmieniła się od poprzedniego odczytu,
+            zwraca True gdy punkty montowania zostały odczytane na nowo """
+        if self.file is not None and not self.poll.poll(0):
+            return False
+
+        if self.file is None:
+            self.file = open(self.MOUNTINFO_PATH, 'r')
+            self.poll = select.poll()
+            self.poll.register(self.file, select.POLLPRI | select.POLLERR)
+
+        # Odczyt od początku kasuje zgłoszoną zmianę
+        self.file.seek(0)
+        self.mount_points = parse_mountinfo(self.file.readlines())
+        self.by_device = self._map_devices(self.mount_points)
+        return True
+
+    def mount_points_of(self, name, major, minor):
+        """ Zwraca listę katalogów w których zamontowane jest urządzenie o podanej nazwie i numerach,
+            według ostatniego odczytu przez refresh """
+        return self.by_device.get('%d:%d' % (major, minor), []) + self.by_device.get(name, [])
+
+    def close(self):
+        """ Zamyka plik mountinfo """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    @staticmethod
+    def _map_devices(mount_points):
+        """ Tworzy słownik urządzenie: lista katalogów. Urządzenie opisane jest numerami major:minor, a dla systemów plików
+            których numer nie odpowiada urządzeniu blokowemu (np. btrfs) także nazwą urządzenia źródłowego z /dev """
+        by_device = {}
+        for mount_point in mount_points:
+            by_device.setdefault(mount_point.st_dev, []).append(mount_point.mount_point)
+
+            if mount_point.mount_source.startswith('/dev/'):
+                # Dowiązania, np. /dev/mapper/root, wskazują na właściwe urządzenie, np. /dev/dm-0
+                name = os.path.basename(os.path.realpath(mount_point.mount_source))
+                major, minor = mount_point.st_dev.split(':')
+                if not os.path.exists('/sys/dev/block/%s:%s' % (major, minor)):
+                    by_device.setdefault(name, []).append(mount_point.mount_point)
+
+        return by_device
@@ -1,50 +1,13 @@
 # -*- coding: utf-8 -*-
 
-import time
+import os
 from PySide2.QtWidgets import *
 from PySide2.QtCore import *
-from threading import Thread, Lock
-from data import data
 from processesTab import ProcessesTab
-
-
-class RefreshingTimer(Thread, QObject):
-    """ Timer odpowiedzialny za odświeżanie zawartości okna co ustalony czas """
-
-    def __init__(self, period):
-        Thread.__init__(self)
-        QObject.__init__(self)
-
-        self.no_refresh = Lock()
-
-        self.period = period
-        self.setDaemon(True)
-
-    def run(self):
-        """ Odświeżanie co czas period """
-
-        while True:
-
-            # Jeżeli okres wynosi zero to usypiam wątek - zatrzymuje odświeżanie
-            while self.period == 0:
-                self.no_refresh.acquire()
-
-            time.sleep(self.period)
-            data.update()
-
-    @Slot(float)
-    def change_period(self, period):
-        print(period)
-
-        # Jeśli timer jest zatrzymany to go wznawiam
-        if self.period == 0 and period != 0:
-            self.no_refresh.release()
-
-        self.period = period
-
-    @Slot()
-    def refresh_now(self):
-        data.update()
+from processorTab import ProcessorTab
+from memoryTab import MemoryTab
+from discsTab import DiscsTab
+from scheduler import Scheduler
 
 
 class MainWindow(QMainWindow):
@@ -54,20 +17,36 @@ class MainWindow(QMainWindow):
     WINDOW_WIDTH = 1000
     WINDOW_HEIGHT = 600
 
-    def __init__(self):
+    # Okresy odświeżania poszczególnych danych w sekundach, okres drzewa procesów można zmienić w menu
+    CPU_PERIOD = 0.2
+    MEMORY_PERIOD = 1
+    PROCESSES_PERIOD = 2
+    SLOW_PROCESS_FIELDS_PERIOD = 10
+    MEMORY_TOP_PERIOD = 2
+    DISKS_PERIOD = 1
+
+    def __init__(self, data):
+        """ Okno wyświetla dane z obiektu DataPack, którego funkcje update_* wywołuje wątek zbierający dane """
         QMainWindow.__init__(self)
+        self.data = data
 
         # Ustalenie tytułu i rozmiaru okna
         self.setWindowTitle(MainWindow.WINDOW_TITLE)
         self.setGeometry(100, 100, MainWindow.WINDOW_WIDTH, MainWindow.WINDOW_HEIGHT)
 
         # Dodanie głównej zawartośći okna
-        self.central_widget = CentralWidget()
+        self.central_widget = CentralWidget(data)
         self.setCentralWidget(self.central_widget)
 
-        # Stworzenie timera odświeżającego okno co dany okres
-        self.timer = RefreshingTimer(1)
-        self.timer.start()
+        # Stworzenie wątku zbierającego dane, każde źródło danych ma własny okres
+        self.scheduler = Scheduler()
+        self.scheduler.add_task('cpu', data.update_cpu, MainWindow.CPU_PERIOD)
+        self.scheduler.add_task('memory', data.update_memory, MainWindow.MEMORY_PERIOD)
+        self.scheduler.add_task('processes', data.update_processes, MainWindow.PROCESSES_PERIOD)
+        self.scheduler.add_task('slow_process_fields', data.update_slow_process_fields, MainWindow.SLOW_PROCESS_FIELDS_PERIOD)
+        self.scheduler.add_task('memory_top', data.update_memory_top, MainWindow.MEMORY_TOP_PERIOD)
+        self.scheduler.add_task('disks', data.update_disks, MainWindow.DISKS_PERIOD)
+        self.scheduler.start()
 
         # Dodanie menu
         self._create_menu()
@@ -93,6 +72,9 @@ class MainWindow(QMainWindow):
         self.column_state = ColumnSelectButton('State', self.central_widget.tab_panel.tab1.processesPanel.set_column_visible, True)
         self.view_menu.addAction(self.column_state)
 
+        self.column_cpu = ColumnSelectButton('CPU', self.central_widget.tab_panel.tab1.processesPanel.set_column_visible, True)
+        self.view_menu.addAction(self.column_cpu)
+
         self.column_memory = ColumnSelectButton('Memory', self.central_widget.tab_panel.tab1.processesPanel.set_column_visible, False)
         self.view_menu.addAction(self.column_memory)
 
@@ -117,29 +99,52 @@ class MainWindow(QMainWindow):
         self.column_oomscore = ColumnSelectButton('OOM Score', self.central_widget.tab_panel.tab1.processesPanel.set_column_visible, False)
         self.view_menu.addAction(self.column_oomscore)
 
+        self.column_diskread = ColumnSelectButton('Disk Read', self.central_widget.tab_panel.tab1.processesPanel.set_column_visible, False)
+        self.view_menu.addAction(self.column_diskread)
+
+        self.column_diskwrite = ColumnSelectButton('Disk Write', self.central_widget.tab_panel.tab1.processesPanel.set_column_visible, False)
+        self.view_menu.addAction(self.column_diskwrite)
+
+        self.column_iocalls = ColumnSelectButton('IO Calls', self.central_widget.tab_panel.tab1.processesPanel.set_column_visible, False)
+        self.view_menu.addAction(self.column_iocalls)
+
         # Wypełnianie menu refresh
         self.refresh_group = QActionGroup(self.refresh_menu)
 
-        self.refresh02 = RefreshButton('0.2 seconds', 0.2, self.refresh_group, self.timer.change_period)
+        self.refresh02 = RefreshButton('0.2 seconds', 0.2, self.refresh_group, self.change_period)
         self.refresh_menu.addAction(self.refresh02)
 
-        self.refresh05 = RefreshButton('0.5 seconds', 0.5, self.refresh_group, self.timer.change_period)
+        self.refresh05 = RefreshButton('0.5 seconds', 0.5, self.refresh_group, self.change_period)
         self.refresh_menu.addAction(self.refresh05)
-        self.refresh05.setChecked(True)
 
-        self.refresh1 = RefreshButton('1 seconds', 1, self.refresh_group, self.timer.change_period)
+        self.refresh1 = RefreshButton('1 seconds', 1, self.refresh_group, self.change_period)
         self.refresh_menu.addAction(self.refresh1)
 
-        self.refresh2 = RefreshButton('2 seconds', 2, self.refresh_group, self.timer.change_period)
+        self.refresh2 = RefreshButton('2 seconds', 2, self.refresh_group, self.change_period)
         self.refresh_menu.addAction(self.refresh2)
+        self.refresh2.setChecked(True)
 
-        self.norefresh = RefreshButton('No refresh', 0, self.refresh_group, self.timer.change_period)
+        self.norefresh = RefreshButton('No refresh', 0, self.refresh_group, self.change_period)
         self.refresh_menu.addAction(self.norefresh)
 
         self.refresh_now = QAction('Refresh now')
         self.refresh_menu.addSeparator()
         self.refresh_menu.addAction(self.refresh_now)
-        self.refresh_now.triggered.connect(self.timer.refresh_now)
+        self.refresh_now.triggered.connect(self.refresh_all)
+
+    @Slot(float)
+    def change_period(self, period):
+        """ Zmiana okresu odświeżania drzewa procesów, okres 0 zatrzymuje odświeżanie wszystkich danych """
+        if period == 0:
+            self.scheduler.pause()
+        else:
+            self.scheduler.set_period('processes', period)
+            self.scheduler.resume()
+
+    @Slot()
+    def refresh_all(self):
+        """ Ręczne odświeżenie wszystkich danych, wykonywane w wątku zbierającym dane by nie blokować gui """
+        self.scheduler.request()
 
 
 class RefreshButton(QAction):
@@ -173,7 +178,7 @@ class ColumnSelectButton(QAction):
 class CentralWidget(QWidget):
     """ Widget znajdujący się w głównej części okna """
 
-    def __init__(self):
+    def __init__(self, data):
         """ Dodawanie elementów do widgeta """
 
         QWidget.__init__(self)
@@ -194,14 +199,14 @@ class CentralWidget(QWidget):
         self.bars_layout.addWidget(self.ram_bar)
         data.ram_space_changed.connect(self.ram_bar.setValue)
 
-        self.tab_panel = TabPanel()
+        self.tab_panel = TabPanel(data)
         self.vertical_layout.addWidget(self.tab_panel)
 
 
 class TabPanel(QWidget):
     """ Klasa przedstawiająca panel z zakładkami znajdujący się w głównym oknie """
 
-    def __init__(self):
+    def __init__(self, data):
         """ W konstruktorze tworzone są wszystkie zakładki """
         QWidget.__init__(self)
 
@@ -213,10 +218,10 @@ class TabPanel(QWidget):
         self.layout.addWidget(self.tab_widget)
         self.tab_widget.resize(300, 200)
 
-        self.tab1 = ProcessesTab()
-        self.tab2 = QWidget()
-        self.tab3 = QWidget()
-        self.tab4 = QWidget()
+        self.tab1 = ProcessesTab(data)
+        self.tab2 = ProcessorTab(data)
+        self.tab3 = MemoryTab(data)
+        self.tab4 = DiscsTab(data)
 
         self.tab_widget.addTab(self.tab1, "Processes")
         self.tab_widget.addTab(self.tab2, "Processor")
@@ -244,6 +249,20 @@ class TitledProgressBar(QProgressBar):
         return self.title + ' ' + super().text()
 
 
+# Reguły css dla wyglądu kolorowego paska, odczytywane przy pierwszym użyciu z katalogu programu
+PROGRESS_BAR_STYLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ProgressBar.css')
+_progress_bar_style = None
+
+
+def get_progress_bar_style():
+    """ Funkcja zwraca reguły css kolorowego paska, plik odczytywany jest tylko raz """
+    global _progress_bar_style
+    if _progress_bar_style is None:
+        with open(PROGRESS_BAR_STYLE_PATH) as f:
+            _progress_bar_style = f.read()
+    return _progress_bar_style
+
+
 class ColorProgressBar(TitledProgressBar):
     """ Pasek postępu z tytułem zmieniający kolor w zależności od wartości """
 
@@ -258,7 +277,7 @@ class ColorProgressBar(TitledProgressBar):
         """ Robi to samo co wcześniej, lecz jeszcze zmienia kolor """
 
         color = self._calculate_color(value)
-        self.setStyleSheet(ColorProgressBar.style % color)
+        self.setStyleSheet(get_progress_bar_style() % color)
         super().setValue(value)
 
     def _calculate_color(self, value):
@@ -271,9 +290,6 @@ class ColorProgressBar(TitledProgressBar):
         hue = int(self.MIN_COLOR - (self.MIN_COLOR - self.MAX_COLOR) * percent)
         return str(hue) + r", 100%, 50%"
 
-    # Odczytanie reguł css dla wyglądu paska przy pierwszym użyciu klasy
-    with open('ProgressBar.css') as f:
-        style = ''.join(f.readlines())
 
 
 
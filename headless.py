@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from processes import Processes, CollectionPlan, USER_NAMES
+from resources import CpuTracker, ProcSampler
+from scheduler import Scheduler
+
+# Domyślny adres i port na którym udostępniane są metryki, domyślnie tylko lokalnie
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9101
+
+# Przedrostek nazw wszystkich metryk
+METRICS_PREFIX = 'taskmanager_'
+
+# Typ zawartości odpowiedzi w formacie tekstowym Prometheusa
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label_value(value):
+    """ Funkcja zamienia znaki specjalne w wartości etykiety zgodnie z formatem tekstowym Prometheusa """
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class MetricsWriter:
+    """ Klasa budująca tekst odpowiedzi w formacie Prometheusa, każda metryka z nagłówkami HELP i TYPE """
+
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, description, samples, kind='gauge'):
+        """ Funkcja dopisuje metrykę, samples to lista par (słownik etykiet lub None, wartość) """
+        name = METRICS_PREFIX + name
+        self.lines.append('# HELP %s %s' % (name, description))
+        self.lines.append('# TYPE %s %s' % (name, kind))
+        for labels, value in samples:
+            if labels:
+                labels = ','.join('%s="%s"' % (key, escape_label_value(label)) for key, label in labels.items())
+                self.lines.append('%s{%s} %s' % (name, labels, repr(float(value))))
+            else:
+                self.lines.append('%s %s' % (name, repr(float(value))))
+
+    def render(self):
+        """ Zwraca gotową odpowiedź w postaci bajtów """
+        return ('\n'.join(self.lines) + '\n').encode('utf-8')
+
+
+class HeadlessCollector:
+    """ Klasa zbierająca dane o procesach i zasobach bez gui. Dane zbierane są przez Scheduler,
+        a po każdej aktualizacji metryki są formatowane raz i zapamiętywane, więc zapytania o metryki
+        tylko zwracają gotowy tekst i nie powodują dodatkowych odczytów z /proc """
+
+    def __init__(self):
+        """ Konstruktor, zużycie procesora jest znane dopiero po drugiej aktualizacji """
+        self.cpu_tracker = CpuTracker()
+        self.cpu_times = None
+        self.cpu_loads = None
+        self.memory_info = None
+        self.processes = Processes()
+        self.processes.plan = CollectionPlan(['owner'])
+        self.process_cpu_tracker = None
+        self.process_metrics = None
+        self.collection_time = None
+        self.metrics = b''
+        self.update_lock = threading.Lock()
+
+        # Źródło danych - domyślnie pliki /proc trzymane otwarte, może zostać zastąpione odtwarzanym nagraniem
+        self.sampler = ProcSampler()
+        self.get_cpus_times = self.sampler.get_cpus_times
+        self.get_memory_info = self.sampler.get_memory_info
+        self.replay = None
+        self.recorder = None
+
+    def replay_from(self, replay):
+        """ Funkcja przełącza źródło danych na odtwarzane nagranie recording.Replay """
+        self.replay = replay
+        self.get_cpus_times = replay.get_cpus_times
+        self.get_memory_info = replay.get_memory_info
+        self.processes = replay.create_processes()
+
+    def record_to(self, recorder):
+        """ Funkcja włącza zapis każdego stanu procesów, procesorów i pamięci przez recording.Recorder """
+        self.recorder = recorder
+        self.processes.plan = self.processes.plan.union(recorder.PLAN)
+
+    def update_cpu(self):
+        """ Funkcja aktualizuje obciążenie procesorów """
+        self.cpu_times = self.get_cpus_times()
+        cpu_loads = self.cpu_tracker.update_with(self.cpu_times)
+        if cpu_loads:
+            with self.update_lock:
+                self.cpu_loads = cpu_loads
+                self._render()
+
+    def update_memory(self):
+        """ Funkcja aktualizuje stan pamięci """
+        memory_info = self.get_memory_info()
+        with self.update_lock:
+            self.memory_info = memory_info
+            self._render()
+
+    def update_processes(self):
+        """ Funkcja aktualizuje procesy i wylicza zagregowane zużycie procesora i pamięci na użytkownika i nazwę procesu """
+        # NumPy jest importowany w wątku roboczym przy pierwszej aktualizacji, więc serwer startuje bez czekania na niego
+        import numpy as np
+        from snapshot import ProcessTable, ProcessCpuTracker
+        if self.process_cpu_tracker is None:
+            self.process_cpu_tracker = ProcessCpuTracker()
+
+        start = time.monotonic()
+        self.processes.update()
+        table = ProcessTable.from_processes(self.processes, with_owner=True)
+
+        # Przy odtwarzaniu zużycie procesora liczone jest według czasu zapisanego w nagraniu
+        timestamp = self.replay.timestamp if self.replay is not None else None
+        if timestamp is not None and timestamp == self.process_cpu_tracker.previous_time:
+            return
+        usage = self.process_cpu_tracker.update(table, timestamp)
+        if self.recorder is not None:
+            self.recorder.record(table, self.cpu_times, self.memory_info)
+
+        # Sumy dla użytkowników i nazw liczone są dla wszystkich procesów naraz
+        uids, uid_codes = np.unique(table['uid'], return_inverse=True)
+        by_user = {
+            'cpu': np.bincount(uid_codes, weights=usage.cpu_percent, minlength=len(uids)),
+            'rss': np.bincount(uid_codes, weights=usage.rss_bytes, minlength=len(uids)),
+            'count': np.bincount(uid_codes, minlength=len(uids)),
+        }
+        comm_codes = table.comm_codes
+        by_comm = {
+            'cpu': np.bincount(comm_codes, weights=usage.cpu_percent, minlength=len(table.comm_names)),
+            'rss': np.bincount(comm_codes, weights=usage.rss_bytes, minlength=len(table.comm_names)),
+            'count': np.bincount(comm_codes, minlength=len(table.comm_names)),
+        }
+        users = [USER_NAMES.get(uid) for uid in uids.tolist()]
+        process_metrics = (len(table), (users, by_user), (table.comm_names, by_comm))
+
+        with self.update_lock:
+            self.process_metrics = process_metrics
+            self.collection_time = time.monotonic() - start
+            self._render()
+
+    def get_metrics(self):
+        """ Zwraca ostatnio przygotowany tekst metryk """
+        return self.metrics
+
+    def _render(self):
+        """ Funkcja formatuje metryki z aktualnych danych, wywoływana pod blokadą po każdej aktualizacji """
+        writer = MetricsWriter()
+
+        if self.cpu_loads is not None:
+            writer.metric('cpu_load_ratio', 'Fraction of time the CPU was busy since the previous reading',
+                          [({'cpu': name}, load) for name, load in zip(self.cpu_loads.names(), self.cpu_loads.column('load').tolist())])
+
+        if self.memory_info is not None:
+            # Wartości z /proc/meminfo są w kilobajtach, poza licznikami stron HugePages
+            writer.metric('memory_bytes', 'Memory statistics from /proc/meminfo',
+                          [({'field': key}, value * 1024) for key, value in self.memory_info.items() if not key.startswith('HugePages_')])
+
+        if self.process_metrics is not None:
+            count, (users, by_user), (comms, by_comm) = self.process_metrics
+            writer.metric('processes', 'Number of processes', [(None, count)])
+            for label, names, sums in (('user', users, by_user), ('comm', comms, by_comm)):
+                writer.metric('%s_cpu_percent' % label, 'CPU usage of processes grouped by %s, 100 is one core' % label,
+                              [({label: name}, value) for name, value in zip(names, sums['cpu'].tolist())])
+                writer.metric('%s_rss_bytes' % label, 'Resident memory of processes grouped by %s' % label,
+                              [({label: name}, value) for name, value in zip(names, sums['rss'].tolist())])
+                writer.metric('%s_processes' % label, 'Number of processes grouped by %s' % label,
+                              [({label: name}, value) for name, value in zip(names, sums['count'].tolist())])
+            writer.metric('collection_seconds', 'Time of the last processes collection', [(None, self.collection_time)])
+
+        self.metrics = writer.render()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """ Obsługa zapytań HTTP, pod adresem /metrics zwracane są ostatnio przygotowane metryki """
+
+    # Obiekt HeadlessCollector, ustawiany przez serve
+    collector = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = self.collector.get_metrics()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """ Zapytania nie są wypisywane, zbieracze odpytują serwer bardzo często """
+        pass
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, cpu_period=1, memory_period=1, processes_period=5, replay=None, recorder=None):
+    """ Funkcja uruchamia zbieranie danych i serwer metryk, działa do przerwania programu.
+        Opcjonalnie dane pochodzą z odtwarzanego nagrania lub są zapisywane do nagrania """
+
+    collector = HeadlessCollector()
+    if replay is not None:
+        collector.replay_from(replay)
+    if recorder is not None:
+        collector.record_to(recorder)
+
+    scheduler = Scheduler()
+    scheduler.add_task('cpu', collector.update_cpu, cpu_period)
+    scheduler.add_task('memory', collector.update_memory, memory_period)
+    scheduler.add_task('processes', collector.update_processes, processes_period)
+    scheduler.start()
+
+    handler = type('Handler', (MetricsHandler,), {'collector': collector})
+    server = ThreadingHTTPServer((host, port), handler)
+    print('Serving metrics on http://%s:%d/metrics' % (host, server.server_port), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        scheduler.stop()
+        scheduler.join()
+        if recorder is not None:
+            recorder.close()
+
+
+def main(argv=None):
+    """ Punkt wejścia trybu bez gui """
+    parser = argparse.ArgumentParser(description='Task Manager collector serving Prometheus metrics')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on (default: %(default)s)')
+    parser.add_argument('--cpu-period', type=float, default=1, help='CPU load refresh period in seconds')
+    parser.add_argument('--memory-period', type=float, default=1, help='memory refresh period in seconds')
+    parser.add_argument('--processes-period', type=float, default=5, help='processes refresh period in seconds')
+    parser.add_argument('--record', metavar='PATH', help='record every processes update to a file')
+    parser.add_argument('--replay', metavar='PATH', help='serve metrics from a recording instead of /proc')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed (default: %(default)s)')
+    parser.add_argument('--offset', type=float, default=0.0, help='start the replay this many seconds into the recording')
+    args = parser.parse_args(argv)
+
+    # Moduł nagrań korzysta z NumPy, więc importujemy go tylko gdy jest potrzebny
+    replay = recorder = None
+    if args.replay or args.record:
+        import recording
+        replay = recording.Replay(args.replay, args.speed, args.offset) if args.replay else None
+        recorder = recording.Recorder(args.record) if args.record else None
+    serve(args.host, args.port, args.cpu_period, args.memory_period, args.processes_period, replay, recorder)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import numpy as np
+from disks import DISK_RATE_KEYS
+from resources import CPU_LOAD_INDEXES
+
+# Stany procesora zapamiętywane w historii (ułamki czasu od poprzedniego odczytu) i łączne obciążenie
+CPU_HISTORY_KEYS = ('user', 'system', 'iowait', 'steal', 'load')
+CPU_HISTORY_COLUMNS = [CPU_LOAD_INDEXES[key] for key in CPU_HISTORY_KEYS]
+
+# Domyślna liczba zapamiętywanych próbek, przy odświeżaniu co 0.2 s są to 2 minuty
+DEFAULT_CAPACITY = 600
+
+
+class RingBuffer:
+    """ Bufor cykliczny o stałej pojemności oparty na tablicy NumPy alokowanej raz przy tworzeniu - każda próbka to tablica
+        o kształcie shape. Licznik sequence rośnie z każdą dopisaną próbką, więc czytelnik w innym wątku może pobrać
+        tylko próbki których jeszcze nie widział """
+
+    def __init__(self, capacity, shape=(), dtype=np.float64):
+        """ Funkcja alokuje miejsce na capacity próbek """
+        self.capacity = capacity
+        self.data = np.zeros((capacity,) + tuple(shape), dtype=dtype)
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        """ Liczba zapamiętanych próbek """
+        return min(self.sequence, self.capacity)
+
+    def __repr__(self):
+        return "RingBuffer[%d/%d, sample shape: %s]" % (len(self), self.capacity, self.data.shape[1:])
+
+    def append(self, sample):
+        """ Funkcja dopisuje próbkę, najstarsza próbka jest nadpisywana """
+        with self.lock:
+            self.data[self.sequence % self.capacity] = sample
+            self.sequence += 1
+
+    def last(self, count=None, index=(), out=None):
+        """ Zwraca count ostatnich próbek (domyślnie wszystkie) od najstarszej do najnowszej. Index wybiera część
+            każdej próbki, np. jeden wiersz. Próbki są kopiowane do out jeśli podano tablicę, inaczej do nowej tablicy """
+        with self.lock:
+            count = len(self) if count is None else min(count, len(self))
+            return self._copy(self.sequence - count, index, out)
+
+    def since(self, sequence, limit=None, index=(), out=None):
+        """ Zwraca parę (bieżący licznik, próbki dopisane od chwili gdy licznik miał podaną wartość), co najwyżej limit
+            ostatnich z nich. Próbki które zostały już nadpisane są pomijane """
+        with self.lock:
+            start = max(sequence, self.sequence - self.capacity)
+            if limit is not None:
+                start = max(start, self.sequence - limit)
+            return self.sequence, self._copy(start, index, out)
+
+    def _copy(self, start, index, out):
+        """ Kopiuje próbki od numeru start do ostatniej, wywoływana pod blokadą """
+        count = self.sequence - start
+        if out is None:
+            out = np.empty((count,) + self.data[0][index].shape, dtype=self.data.dtype)
+        out = out[:count]
+
+        # Próbki mogą być zapisane w dwóch kawałkach - na końcu i na początku tablicy
+        index = (slice(None),) + (index if isinstance(index, tuple) else (index,))
+        first = start % self.capacity
+        head = min(count, self.capacity - first)
+        out[:head] = self.data[first:first+head][index]
+        out[head:] = self.data[:count-head][index]
+        return out
+
+
+class CpuHistory:
+    """ Historia obciążenia procesorów - próbka to tablica o kształcie (procesory, CPU_HISTORY_KEYS), pierwszy wiersz
+        to wszystkie procesory razem, a ids to numery procesorów kolejnych wierszy. Zmiana zbioru procesorów (włączenie
+        lub wyłączenie rdzenia) rozpoczyna nową historię w nowym buforze. Tak jak w DiskHistory numery i bufor
+        podmieniane są razem jedną krotką current = (ids, samples) """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """ Bufor tworzony jest przy pierwszej próbce, gdy znana jest liczba procesorów """
+        self.capacity = capacity
+        self.current = ((), None)
+
+    def __repr__(self):
+        return "CpuHistory[%s]" % self.samples
+
+    @property
+    def ids(self):
+        """ Numery procesorów kolejnych wierszy próbki """
+        return self.current[0]
+
+    @property
+    def samples(self):
+        """ Bufor próbek """
+        return self.current[1]
+
+    @property
+    def cpus(self):
+        """ Liczba wierszy próbki - procesory razem z wierszem sumy """
+        return self.samples.data.shape[1] if self.samples is not None else 0
+
+    def append(self, cpu_loads):
+        """ Funkcja dopisuje obciążenia CpuLoads zwrócone przez CpuTracker.update """
+        ids, samples = self.current
+        if samples is None or cpu_loads.ids != ids:
+            samples = RingBuffer(self.capacity, (len(cpu_loads), len(CPU_HISTORY_KEYS)), np.float32)
+            self.current = (cpu_loads.ids, samples)
+        samples.append(cpu_loads.fractions[:, CPU_HISTORY_COLUMNS])
+
+
+# Wartości z /proc/meminfo zapamiętywane w historii (w kilobajtach), Used i SwapUsed są wyliczane
+MEMORY_HISTORY_KEYS = ('MemTotal', 'MemAvailable', 'Used', 'Cached', 'Buffers', 'Dirty', 'Slab', 'SwapTotal', 'SwapUsed')
+
+# Klucze z /proc/meminfo potrzebne do wyliczenia próbki historii
+MEMINFO_KEYS = ('MemTotal', 'MemAvailable', 'Cached', 'Buffers', 'Dirty', 'Slab', 'SwapTotal', 'SwapFree')
+
+
+class MemoryHistory:
+    """ Historia wykorzystania pamięci - próbka to wektor wartości MEMORY_HISTORY_KEYS """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.samples = RingBuffer(capacity, (len(MEMORY_HISTORY_KEYS),))
+
+    def __repr__(self):
+        return "MemoryHistory[%s]" % self.samples
+
+    def append(self, memory_info):
+        """ Funkcja dopisuje słownik zwrócony przez resources.get_memory_info, brakujące wartości są zerami """
+        values = dict(memory_info)
+        values['Used'] = values.get('MemTotal', 0) - values.get('MemAvailable', 0)
+        values['SwapUsed'] = values.get('SwapTotal', 0) - values.get('SwapFree', 0)
+        self.samples.append([values.get(key, 0) for key in MEMORY_HISTORY_KEYS])
+
+
+class DiskHistory:
+    """ Historia obciążenia dysków - próbka to tablica o kształcie (urządzenia, DISK_RATE_KEYS), kolejność urządzeń
+        zapisana jest w names. Zmiana zbioru urządzeń rozpoczyna nową historię w nowym buforze. Nazwy i bufor
+        podmieniane są razem jedną krotką current = (names, samples), więc czytelnik w innym wątku odczytuje parę
+        z tej samej chwili """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """ Bufor tworzony jest przy pierwszej próbce, gdy znane są urządzenia """
+        self.capacity = capacity
+        self.current = ((), None)
+
+    def __repr__(self):
+        return "DiskHistory[%s]" % self.samples
+
+    @property
+    def names(self):
+        """ Nazwy urządzeń kolejnych wierszy próbki """
+        return self.current[0]
+
+    @property
+    def samples(self):
+        """ Bufor próbek """
+        return self.current[1]
+
+    def append(self, disk_rates):
+        """ Funkcja dopisuje obciążenia zwrócone przez disks.DiskTracker.update """
+        names, samples = self.current
+        if samples is None or tuple(disk_rates) != names:
+            names = tuple(disk_rates)
+            samples = RingBuffer(self.capacity, (len(names), len(DISK_RATE_KEYS)), np.float32)
+            self.current = (names, samples)
+        samples.append([[rates[key] for key in DISK_RATE_KEYS] for rates in disk_rates.values()])
@@ -2,11 +2,47 @@
 
 from PySide2.QtWidgets import QApplication
 import sys
+import argparse
+from data import DataPack
 from gui import MainWindow
 
-if __name__ == "__main__":
-    app = QApplication([])
-    window = MainWindow()
+
+def parse_arguments(argv):
+    """ Funkcja odczytuje opcje programu, pozostałe argumenty są przekazywane do Qt """
+    parser = argparse.ArgumentParser(description='Task Manager')
+    parser.add_argument('--record', metavar='PATH', help='record every processes update to a file')
+    parser.add_argument('--replay', metavar='PATH', help='show a recording instead of the current state')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed (default: %(default)s)')
+    parser.add_argument('--offset', type=float, default=0.0, help='start the replay this many seconds into the recording')
+    return parser.parse_known_args(argv)
+
+
+def main(argv):
+    """ Funkcja tworzy obiekt z danymi i główne okno, zwraca kod wyjścia aplikacji """
+    args, qt_args = parse_arguments(argv[1:])
+    data = DataPack()
+
+    # Moduł nagrań jest potrzebny tylko przy nagrywaniu lub odtwarzaniu, więc importujemy go tylko wtedy
+    recorder = None
+    if args.replay or args.record:
+        import recording
+        if args.replay:
+            data.replay_from(recording.Replay(args.replay, args.speed, args.offset))
+        if args.record:
+            recorder = recording.Recorder(args.record)
+            data.record_to(recorder)
+
+    app = QApplication(argv[:1] + qt_args)
+    window = MainWindow(data)
     window.show()
-    sys.exit(app.exec_())
+    status = app.exec_()
+
+    if recorder is not None:
+        window.scheduler.stop()
+        window.scheduler.join()
+        recorder.close()
+    return status
 
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,118 @@
+from PySide2.QtWidgets import *
+from PySide2.QtCore import *
+from PySide2.QtGui import QColor
+from history import MEMORY_HISTORY_KEYS
+from charts import LineChart
+from resources import convert_bytes_to_readable_form
+from tableModel import RowsTableModel
+
+
+class MemoryTab(QWidget):
+    """ Zakładka memory - wykresy historii zajętości pamięci i wymiany, bieżące wartości z /proc/meminfo
+        oraz procesy zajmujące najwięcej pamięci """
+
+    # Serie wykresu pamięci i ich kolory, skalowane względem pamięci całkowitej
+    MEMORY_SERIES = {'Used': QColor(230, 25, 75), 'Cached': QColor(0, 130, 200), 'Buffers': QColor(60, 180, 75),
+                     'Slab': QColor(145, 30, 180), 'Dirty': QColor(245, 130, 48)}
+    SWAP_SERIES = {'SwapUsed': QColor(230, 25, 75)}
+
+    # Wartości wyświetlane pod wykresami
+    SUMMARY_KEYS = ('MemTotal', 'MemAvailable', 'Used', 'Cached', 'Buffers', 'Dirty', 'Slab', 'SwapTotal', 'SwapUsed')
+
+    def __init__(self, data):
+        """ Dodawanie komponentów do zakładki, dane pochodzą z obiektu DataPack """
+        QWidget.__init__(self)
+        self.data = data
+
+        self.layout = QVBoxLayout()
+        self.layout.setMargin(0)
+        self.setLayout(self.layout)
+
+        # Legenda
+        self.legend_layout = QHBoxLayout()
+        self.layout.addLayout(self.legend_layout)
+        for name, color in self.MEMORY_SERIES.items():
+            label = QLabel(name)
+            label.setStyleSheet('color: %s; font-weight: bold' % color.name())
+            self.legend_layout.addWidget(label)
+        self.legend_layout.addStretch()
+
+        # Wykresy
+        samples = self.data.memory_history.samples
+        self.memory_chart = LineChart('Memory', samples, (), self._series(self.MEMORY_SERIES),
+                                      MEMORY_HISTORY_KEYS.index('MemTotal'), height=120)
+        self.swap_chart = LineChart('Swap', samples, (), self._series(self.SWAP_SERIES),
+                                    MEMORY_HISTORY_KEYS.index('SwapTotal'))
+        self.charts = [self.memory_chart, self.swap_chart]
+        for chart in self.charts:
+            self.layout.addWidget(chart)
+
+        # Bieżące wartości
+        self.summary_layout = QGridLayout()
+        self.layout.addLayout(self.summary_layout)
+        self.summary_labels = {}
+        for position, key in enumerate(self.SUMMARY_KEYS):
+            label = QLabel()
+            self.summary_labels[key] = label
+            self.summary_layout.addWidget(QLabel(key + ':'), position // 3, position % 3 * 2)
+            self.summary_layout.addWidget(label, position // 3, position % 3 * 2 + 1)
+
+        # Procesy zajmujące najwięcej pamięci
+        self.model = MemoryTopModel()
+        self.table_view = QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.verticalHeader().hide()
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+        self.table_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.layout.addWidget(self.table_view)
+
+        # Połączenie, dane są zawsze odbierane w wątku gui
+        self.data.memory_history_changed.connect(self.refresh, Qt.QueuedConnection)
+        self.data.memory_top_changed.connect(self.refresh_top, Qt.QueuedConnection)
+
+    @staticmethod
+    def _series(colors):
+        """ Zamienia słownik nazwa: kolor na listę par (indeks w próbce, kolor) """
+        return [(MEMORY_HISTORY_KEYS.index(key), color) for key, color in colors.items()]
+
+    @Slot()
+    def refresh(self):
+        """ Dorysowanie nowych próbek i odświeżenie wartości, ukryta zakładka dorysuje próbki gdy zostanie pokazana """
+        if not self.isVisible():
+            return
+
+        for chart in self.charts:
+            chart.catch_up()
+
+        sample = self.memory_chart.last_sample
+        if sample is not None:
+            for key, label in self.summary_labels.items():
+                label.setText(convert_bytes_to_readable_form(sample[MEMORY_HISTORY_KEYS.index(key)] * 1024))
+
+    @Slot()
+    def refresh_top(self):
+        """ Naniesienie na tabelę nowego zestawienia procesów """
+        self.model.set_rows(self.data.memory_top)
+
+    def showEvent(self, event):
+        QWidget.showEvent(self, event)
+        self.refresh()
+
+
+class MemoryTopModel(RowsTableModel):
+    """ Model tabeli procesów zajmujących najwięcej pamięci, wiersze to krotki (pid, nazwa, rss, pss) z DataPack.memory_top """
+
+    COLUMNS = ['PID', 'Name', 'RSS', 'PSS']
+
+    def _cell(self, row, column):
+        pid, comm, rss, pss = row
+
+        if column == 'PID':
+            return str(pid), pid
+        if column == 'Name':
+            return comm, comm
+        if column == 'RSS':
+            return convert_bytes_to_readable_form(rss), float(rss)
+        if column == 'PSS':
+            return (convert_bytes_to_readable_form(pss), float(pss)) if pss is not None else ('-', -1.0)
+        return '', None
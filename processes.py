@@ -2,8 +2,14 @@
 
 import os
 import os.path
-import subprocess
+import sys
+import time
 import pwd
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import aio
+import procfs
 
 # Nazwy pól odpowiadające kolejnym tokenom z pliku proc/id/statm, szczegóły w man proc
 STATM_KEYS = ('size', 'resident', 'shared', 'text', 'lib', 'data', 'dt')
@@ -16,6 +22,24 @@ STAT_KEYS = ('pid', 'comm', 'state', 'ppid', 'pgrp', 'session', 'tty_nr', 'tpgid
     'exit_signal', 'processor', 'rt_priority', 'policy', 'delayacct_blkio_ticks', 'guest_time', 'cguest_time',
     'start_data', 'end_data', 'start_brk', 'arg_start', 'arg_end', 'env_start', 'env_end', 'exit_code')
 
+# Pola z pliku proc/id/stat które są od razu zamieniane na liczby, pozostałe są dekodowane dopiero przy pierwszym odwołaniu
+STAT_EAGER_KEYS = ('ppid', 'pgrp', 'session', 'tty_nr', 'minflt', 'majflt', 'utime', 'stime', 'cutime', 'cstime',
+    'priority', 'nice', 'num_threads', 'starttime', 'vsize', 'rss', 'processor')
+
+# Liczniki z pliku proc/pid/io - znaki przeczytane i zapisane przez wywołania systemowe, liczba tych wywołań
+# oraz bajty faktycznie przeczytane i zapisane na urządzeniu blokowym
+IO_KEYS = ('rchar', 'wchar', 'syscr', 'syscw', 'read_bytes', 'write_bytes', 'cancelled_write_bytes')
+
+# Dane które mogą zostać odczytane dla każdego procesu podczas aktualizacji, szczegóły w CollectionPlan
+COLLECTABLE_FIELDS = ('stat', 'statm', 'status', 'io', 'oom', 'owner', 'cmdline')
+
+# Wyniki odświeżenia pojedynczego procesu zwracane przez refresh_process
+REFRESH_ADDED = 'added'             # Nowy proces
+REFRESH_CHANGED = 'changed'         # Proces istniał, jego dane się zmieniły
+REFRESH_UNCHANGED = 'unchanged'     # Proces istniał, plik stat się nie zmienił
+REFRESH_REPLACED = 'replaced'       # Numer pid został przydzielony nowemu procesowi
+REFRESH_GONE = 'gone'               # Proces zakończył działanie
+
 # Numery pid kilku ważnych procesów
 SCHEDULER_PROCESS_PID = 0
 INIT_PROCESS_PID = 1
@@ -82,21 +106,246 @@ class MountPoint:
         return "MountPoint[%s %s %s %s %s %s %s %s %s %s]" % (self.mount_id, self.parent_id, self.st_dev, self.root, self.mount_point, self.mount_options, self.optional_fields, self.fs_type, self.mount_source, self.super_options)
 
 
+def parse_mountinfo(lines):
+    """ Funkcja zamienia wiersze pliku mountinfo na krotkę obiektów MountPoint """
+
+    # Lista do której będziemy dodawać punkty montowania
+    mount_points = []
+
+    for line in lines:
+        # Pierwsze 6 i ostatnie 3 pola zawsze istnieją, natomiast w polu options może wystąpić wiele tokenów, szczegóły w man proc
+        first_tokens = line.strip().split(' ', 6)
+        last_tokens = first_tokens[-1].rsplit(' ', 3)
+        first_tokens = first_tokens[:-1]
+        last_tokens[-4] = last_tokens[-4].strip(' -')
+        all_tokens = first_tokens+last_tokens
+
+        # Stworzenie i dodanie punktu
+        mount_points.append(MountPoint(*all_tokens))
+
+    return tuple(mount_points)
+
+
+class UserNameCache:
+    """ Ograniczona pamięć podręczna nazw użytkowników. Zapytania do NSS (np. LDAP) mogą trwać milisekundy,
+        więc nazwy pamiętane są przez ttl sekund, a nieznane uid przez negative_ttl sekund """
+
+    def __init__(self, max_size=4096, ttl=300.0, negative_ttl=60.0):
+        """ Funkcja inicjuje pustą pamięć o podanym rozmiarze i czasach ważności wpisów """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, uid):
+        """ Funkcja zwraca nazwę użytkownika o podanym uid, dla nieznanego uid zwraca sam numer w postaci napisu """
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.entries.get(uid)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(uid)
+                return entry[0]
+
+        # Zapytanie wykonywane jest poza blokadą, by wolne NSS nie wstrzymywało innych wątków
+        try:
+            name, expires = pwd.getpwuid(uid).pw_name, now + self.ttl
+        except KeyError:
+            name, expires = str(uid), now + self.negative_ttl
+
+        with self.lock:
+            self.entries[uid] = (name, expires)
+            self.entries.move_to_end(uid)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+        return name
+
+    def clear(self):
+        """ Funkcja usuwa wszystkie wpisy """
+        with self.lock:
+            self.entries.clear()
+
+
+# Wspólna dla wszystkich procesów pamięć nazw użytkowników
+USER_NAMES = UserNameCache()
+
+
+class PidSource(ABC):
+    """ Klasa bazowa źródeł numerów pid istniejących procesów. Podklasy mogą korzystać np. z /proc, netlink lub pidfd """
+
+    @abstractmethod
+    def list_pids(self):
+        """ Funkcja zwraca posortowaną listę numerów pid wszystkich istniejących procesów """
+
+
+class ProcDirPidSource(PidSource):
+    """ Źródło numerów pid odczytujące je z jednokrotnego przejrzenia katalogu /proc """
+
+    def __init__(self, proc_directory='/proc'):
+        """ Funkcja zapamiętuje katalog w którym znajdują się katalogi procesów """
+        self.proc_directory = proc_directory
+
+    def list_pids(self):
+        """ Funkcja zwraca numery pid odczytane z nazw katalogów w /proc - koszt zależy od liczby procesów a nie od pid_max """
+
+        # Katalogi procesów to jedyne wpisy w /proc których nazwy składają się z samych cyfr
+        pids = [int(name) for name in os.listdir(self.proc_directory) if name.isdigit()]
+        pids.sort()
+        return pids
+
+
+class ProcessStat:
+    """ Zwięzły rekord z danymi z pliku /proc/pid/stat. Pola z STAT_EAGER_KEYS są zamieniane na liczby przy odczycie,
+        pozostałe pola są dekodowane dopiero przy odwołaniu z zachowanej części linii po nazwie pliku wykonywalnego (bajty).
+        Dostęp jak do atrybutów lub jak do słownika """
+
+    __slots__ = ('tail', 'pid', 'comm', 'state') + STAT_EAGER_KEYS
+
+    # Indeksy pól na liście tokenów występujących po nazwie pliku wykonywalnego
+    _INDEXES = {key: index - 2 for index, key in enumerate(STAT_KEYS) if index >= 2}
+
+    def __init__(self, line):
+        """ Funkcja parsuje zawartość pliku stat w postaci bajtów """
+        pid, comm, tokens = procfs.split_stat(line)
+        self.tail = line[line.rfind(b')')+2:]
+        self.pid = pid
+        self.comm = sys.intern(comm)
+        self.state = tokens[0].decode('ascii')
+        for key in STAT_EAGER_KEYS:
+            setattr(self, key, int(tokens[self._INDEXES[key]]))
+
+    def __getattr__(self, key):
+        """ Wywoływana tylko dla pól spoza __slots__ - dekoduje rzadko używane pole z zachowanej części linii """
+        index = self._INDEXES.get(key)
+        if index is None:
+            raise AttributeError(key)
+        tokens = self.tail.split()
+        return int(tokens[index]) if index < len(tokens) else 0
+
+    def matches(self, content):
+        """ Sprawdza bez kopiowania bufora czy zawartość pliku stat (bajty lub memoryview) jest taka sama jak linia z której
+            utworzono rekord. Część po nazwie nie zawiera nawiasów, więc porównujemy ją z końcem zawartości, a nazwę
+            z bajtami między nawiasami. Nazwa z bajtami spoza UTF-8 nigdy się nie zgadza i jest parsowana ponownie """
+        start = len(str(self.pid)) + 2
+        end = len(content) - len(self.tail)
+        return (end >= start + 2 and content[end-2:end] == b') ' and content[end:] == self.tail
+                and content[start:end-2] == self.comm.encode('utf-8'))
+
+    def __getitem__(self, key):
+        """ Dostęp do pól jak w słowniku, dla zgodności z poprzednią postacią pola stat """
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in STAT_KEYS
+
+    def get(self, key, default=None):
+        """ To samo co w słowniku """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """ Zwraca nazwy wszystkich pól """
+        return STAT_KEYS
+
+    def as_dict(self):
+        """ Zwraca wszystkie pola w postaci słownika """
+        return {key: self[key] for key in STAT_KEYS}
+
+    def __repr__(self):
+        return "ProcessStat[pid: %d, comm: %s, state: %s, ppid: %d]" % (self.pid, self.comm, self.state, self.ppid)
+
+
+class CollectionPlan:
+    """ Klasa opisująca które dane mają być odczytywane dla każdego procesu przy aktualizacji.
+        Plik stat jest odczytywany zawsze, bo zawiera ppid i starttime potrzebne do budowy drzewa i identyfikacji procesu """
+
+    def __init__(self, fields=(), slow=()):
+        """ Funkcja przyjmuje nazwy danych z COLLECTABLE_FIELDS. Właściciel jest odczytywany z pliku status.
+            Dane wymienione w slow są odczytywane tylko dla nowych procesów, a dla pozostałych zachowują
+            poprzednią wartość aż do aktualizacji planem zwróconym przez refreshing_all """
+        unknown = set(fields).union(slow).difference(COLLECTABLE_FIELDS)
+        if unknown:
+            raise ValueError("Unknown fields: %s" % ', '.join(sorted(unknown)))
+        self.fields = frozenset(fields) | frozenset(slow) | {'stat'}
+        self.slow = frozenset(slow) - {'stat'}
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def __eq__(self, other):
+        return isinstance(other, CollectionPlan) and self.fields == other.fields and self.slow == other.slow
+
+    def __hash__(self):
+        return hash((self.fields, self.slow))
+
+    def __repr__(self):
+        return "CollectionPlan[%s]" % ', '.join(field + ('(slow)' if field in self.slow else '') for field in COLLECTABLE_FIELDS if field in self.fields)
+
+    def union(self, other):
+        """ Zwraca plan zawierający dane z obu planów """
+        return CollectionPlan(self.fields | other.fields, (self.slow | other.slow) - (self.fields - self.slow) - (other.fields - other.slow))
+
+    def refreshing_all(self):
+        """ Zwraca plan z tymi samymi danymi, w którym również wolno odświeżane dane są odczytywane """
+        return CollectionPlan(self.fields)
+
+
 class Process:
     """ Klasa reprezentująca proces """
 
+    __slots__ = ('pid', 'parent', 'children', 'stat', 'statm', 'status', 'io', 'oom', 'owner', 'cmdline')
+
     # TODO Dodać do informacji o plikach mapowanych na pamięć informację o NUMA i informacje z pliku smaps
     # TODO Dodać obśługę proc/meminfo
 
     def __init__(self, pid):
         """ W konstruktorze procesu pobierane są wszystkie dane na temat procesu o podanym numerze pid """
-        self.proc_directory = os.path.join('/proc', str(pid))
         self.pid = pid
         self.parent = None
         self.children = []
-        self.stat = {}
+        self.stat = None
+
+        # Dane odczytywane zgodnie z planem przekazanym do collect, None jeśli nie zostały odczytane
+        self.statm = None
+        self.status = None
+        self.io = None
+        self.oom = None
+        self.owner = None
+        self.cmdline = None
+
         self.update_stat()
 
+    @property
+    def proc_directory(self):
+        """ Katalog procesu w /proc, wyznaczany przy odwołaniu by nie przechowywać go w każdym obiekcie """
+        return '/proc/%d' % self.pid
+
+    # Pola z danymi procesu, bez powiązań w drzewie
+    DATA_SLOTS = ('stat', 'statm', 'status', 'io', 'oom', 'owner', 'cmdline')
+
+    def __getstate__(self):
+        """ Przy przesyłaniu do innego procesu pomijamy powiązania w drzewie, by nie serializować całego drzewa """
+        return self.pid, tuple(getattr(self, slot) for slot in self.DATA_SLOTS)
+
+    def __setstate__(self, state):
+        self.pid, values = state
+        self.parent = None
+        self.children = []
+        for slot, value in zip(self.DATA_SLOTS, values):
+            setattr(self, slot, value)
+
+    def update_from(self, other):
+        """ Funkcja przepisuje dane z innego obiektu tego samego procesu, zachowując powiązania w drzewie """
+        for slot in self.DATA_SLOTS:
+            setattr(self, slot, getattr(other, slot))
+
     def __eq__(self, other):
         """ Porównanie zwraca prawdę gdy numer procesu się zgadza z liczbą """
         if isinstance(other, int):
@@ -113,34 +362,62 @@ class Process:
             children_message += str(child.pid) + ' '
         if not children_message:
             children_message = '---'
-        return "[PID %7d, Parent %7s, Children %s]" % (self.pid, self.stat['ppid'], children_message)
+        return "[PID %7d, Parent %7d, Children %s]" % (self.pid, self.stat.ppid, children_message)
 
     def __str__(self):
         """ To samo co repr """
         return self.__repr__()
 
     def update_stat(self):
-        """ Funkcja przyjmująca pid procesu i zwracająca słownik z informacjami odczytanymi z pliku /proc/pid/stat """
+        """ Funkcja odczytuje plik /proc/pid/stat i zapisuje rekord ProcessStat w polu stat.
+            Zwraca prawdę jeżeli zawartość pliku zmieniła się od poprzedniego odczytu """
 
-        # Odczytanie zawartości pliku stat
-        path = os.path.join(self.proc_directory, 'stat')
-        with open(path, 'r') as file:
-            content = file.readline()
+        # Odczytanie zawartości pliku stat do bufora wątku
+        content = procfs.reader().read(self.proc_directory + '/stat', single=True)
 
-        # Nazwa pliku wykonywalnego jest zapisana w odróżnieniu od reszty w nawiasach okrągłych i może zawierać spacje, znajdujemy ten fragment i go usówamy
-        pstart, pend = content.find('('), content.find(')')
-        comm = content[pstart+1:pend]
-        content = content[:pstart-1] + content[pend+1:]
-
-        # Resztę symboli można bez problemu rozdzielić za pomocą spacji
-        content = content.strip()
-        tokens = content.split(' ')
-
-        # Na liście tokenów umieszczamy nazwę pliku wykonywalnego którą wcześniej wyodrębniliśmy
-        tokens.insert(1, comm)
+        # Jeśli nic się nie zmieniło to nie ma potrzeby ponownie parsować zawartości, porównanie nie kopiuje bufora
+        if self.stat is not None and self.stat.matches(content):
+            return False
 
-        # Stworzenie słownika i zapisanie go w polu stat
-        self.stat = dict(zip(STAT_KEYS, tokens))
+        self.stat = ProcessStat(bytes(content))
+        return True
+
+    def collect(self, plan):
+        """ Funkcja odczytuje za jednym razem wszystkie dane procesu wymienione w planie poza plikiem stat,
+            dane spoza planu są zerowane by nie prezentować nieaktualnych wartości. Wolno odświeżane dane
+            z plan.slow są odczytywane tylko jeśli jeszcze ich nie ma """
+        slow = plan.slow
+
+        if 'statm' not in slow or self.statm is None:
+            self.statm = self.read_memory_usage_data() if 'statm' in plan else None
+        # Właściciel nie wymaga pliku status - get_owner korzysta z niego tylko gdy jest w planie
+        if 'status' not in slow or self.status is None:
+            self.status = self.read_status() if 'status' in plan else None
+        if 'oom' not in slow or self.oom is None:
+            self.oom = self.read_oom_properties() if 'oom' in plan else None
+        if 'owner' not in slow or self.owner is None:
+            self.owner = self.get_owner() if 'owner' in plan else None
+        if 'cmdline' not in slow or self.cmdline is None:
+            self.cmdline = self.read_execusion_command() if 'cmdline' in plan else None
+
+        # Plik io jest dostępny tylko dla właściciela procesu i administratora
+        if 'io' not in slow or self.io is None:
+            self.io = None
+            if 'io' in plan:
+                try:
+                    self.io = self.read_io_stats()
+                except PermissionError:
+                    pass
+
+    def read_status(self):
+        """ Funkcja zwraca słownik z informacjami z pliku /proc/pid/status, wartości są napisami """
+
+        status = {}
+        content = procfs.reader().read(self.proc_directory + '/status')
+        for line in bytes(content).decode('utf-8', 'replace').splitlines():
+            key, _, value = line.partition(':')
+            status[key] = value.strip()
+        return status
 
     def read_associated_command(self):
         """ Funkcja odczytuje komendę skojarzoną z procesem """
@@ -228,21 +505,10 @@ class Process:
         return details
 
     def read_io_stats(self):
-        """ Zwraca statystyki operacji wejścia/wyjścia """
-        # Stworzenie słownika z odczytanymi statystykami
-        io_stats = {}
-
-        # Statystyki io znajdują się w pliku proc/id/io
-        path = os.path.join(self.proc_directory, 'io')
-        with open(path, 'r') as file:
-            lines = file.readlines()
-
-            for line in lines:
-                # Statystyki są zapisanie w pliku w postaci parametr: wartość
-                key, value = line.strip().split(':')
-                io_stats[key] = value
-
-        return io_stats
+        """ Zwraca słownik z licznikami operacji wejścia/wyjścia od startu procesu, klucze opisuje IO_KEYS """
+        # Statystyki io znajdują się w pliku proc/id/io w postaci parametr: wartość
+        content = procfs.reader().read(self.proc_directory + '/io', single=True)
+        return procfs.parse_key_values(bytes(content))
 
     def read_limits(self):
         """ Funkcja odczytuje ograniczenia danego procesu i zwraca je w postaci listy objektów Limit """
@@ -287,44 +553,21 @@ class Process:
     def read_mount_points(self):
         """ Funkcja zwraca informacje o punktach montowania w postaci krotki obiektów MountPoint """
 
-        # Lista do której będziemy dodawać punkty montowania
-        mount_points = []
-
         # Informacje o punktach montowania znajdują się w pliku proc/id/mountinfo
         path = os.path.join(self.proc_directory, 'mountinfo')
         with open(path, 'r') as file:
-            lines = file.readlines()
-
-            for line in lines:
-                # Pierwsze 6 i ostatnie 3 pola zawsze istnieją, natomiast w polu options może wystąpić wiele tokenów, szczegóły w man proc
-                first_tokens = line.strip().split(' ', 6)
-                last_tokens = first_tokens[-1].rsplit(' ', 3)
-                first_tokens = first_tokens[:-1]
-                last_tokens[-4] = last_tokens[-4].strip(' -')
-                all_tokens = first_tokens+last_tokens
-
-                # Stworzenie i dodanie punktu
-                mount_points.append(MountPoint(*all_tokens))
-
-        return tuple(mount_points)
+            return parse_mountinfo(file.readlines())
 
     def read_oom_properties(self):
         """ Zwraca informacje dotyczące proawdopodobieństwa, że proces zostanie zabity w sytuacji oom(out-of-memory)
             Funkcja zwraca trzyelementową krotkę (oom_adj, oom_score, oom_score_adj)"""
 
         try:
-            path = os.path.join(self.proc_directory, 'oom_adj')
-            with open(path, 'r') as file:
-                oom_adj = int(file.readline().strip())
-
-            path = os.path.join(self.proc_directory, 'oom_score')
-            with open(path, 'r') as file:
-                oom_score = int(file.readline().strip())
-
-            path = os.path.join(self.proc_directory, 'oom_score_adj')
-            with open(path, 'r') as file:
-                oom_score_adj = int(file.readline().strip())
-
+            # Pliki zawierają jedną liczbę, int pomija białe znaki i przyjmuje widok na bufor
+            reader = procfs.reader()
+            oom_adj = int(reader.read(self.proc_directory + '/oom_adj', single=True))
+            oom_score = int(reader.read(self.proc_directory + '/oom_score', single=True))
+            oom_score_adj = int(reader.read(self.proc_directory + '/oom_score_adj', single=True))
             return oom_adj, oom_score, oom_score_adj
         except FileNotFoundError:
             return 0, 0, 0
@@ -339,15 +582,18 @@ class Process:
     def read_memory_usage_data(self):
         """ Zwraca słownik z informacjami o zużytej ilości stron odczytanych z pliku /proc/pid/statm """
 
-        path = os.path.join(self.proc_directory, 'statm')
-        with open(path, 'r') as file:
-            content = file.readline().strip()
+        content = procfs.reader().read(self.proc_directory + '/statm', single=True)
+        return dict(zip(STATM_KEYS, procfs.parse_ints(bytes(content))))
 
-        # Tokenizacja i konwersja na liczby
-        tokens = content.split(' ')
-        tokens = [int(token) for token in tokens]
+    def read_smaps_rollup(self):
+        """ Zwraca słownik z sumarycznymi danymi o pamięci procesu (Rss, Pss, Swap...) w kilobajtach z pliku /proc/pid/smaps_rollup.
+            Plik istnieje od jądra 4.14 i może go odczytać tylko właściciel procesu, a jego odczyt jest kosztowny,
+            bo jądro przechodzi przez wszystkie strony procesu """
 
-        return dict(zip(STATM_KEYS, tokens))
+        content = bytes(procfs.reader().read(self.proc_directory + '/smaps_rollup'))
+
+        # Pierwszy wiersz zawiera zakres adresów, wątki jądra nie mają żadnych wierszy
+        return procfs.parse_key_values(content[content.find(b'\n')+1:]) if content else {}
 
     def read_schedule_stat(self):
         """ Funkcja zwraca trójelementową krotkę: czas wykonywania procesu, czas oczekiwania, '# of timeslices run on this cpu' """
@@ -361,21 +607,30 @@ class Process:
         return tuple(tokens)
 
     def get_owner(self):
-        """ Funkcja zwraca uid właściciela procesu i nazwe właściciela """
-        try:
-            owner_uid = os.stat(self.proc_directory).st_uid
-            owner_name = pwd.getpwuid(owner_uid).pw_name
-            return owner_uid, owner_name
-        except FileNotFoundError:
-            return 0, 'Unknown'
+        """ Funkcja zwraca uid właściciela procesu i nazwe właściciela. Uid pochodzi z pliku status jeśli został już
+            odczytany, inaczej z os.stat katalogu procesu - jest to wielokrotnie tańsze niż odczyt i parsowanie pliku
+            status. Nazwa pochodzi z pamięci podręcznej USER_NAMES """
+        if self.status is not None:
+            # Wiersz Uid zawiera kolejno uid rzeczywisty, efektywny, zachowany i systemu plików - właścicielem jest efektywny
+            owner_uid = int(self.status['Uid'].split()[1])
+        else:
+            try:
+                owner_uid = os.stat(self.proc_directory).st_uid
+            except FileNotFoundError:
+                return 0, 'Unknown'
+        return owner_uid, USER_NAMES.get(owner_uid)
+
+    def get_identity(self):
+        """ Funkcja zwraca parę (pid, starttime) jednoznacznie identyfikującą proces, także po ponownym użyciu numeru pid """
+        return self.pid, self.stat.starttime
 
     def get_parent_pid(self):
         """ Funkcja zwraca numer pid rodzica """
-        return int(self.stat['ppid'])
+        return self.stat.ppid
 
     def get_readable_state(self):
         """ Funkcja zwraca stan procesu w czytelnej postaci """
-        state = self.stat['state']
+        state = self.stat.state
         if state == 'R':
             return 'Running'
         elif state == 'S':
@@ -405,21 +660,163 @@ class Process:
 
     def kill(self):
         """ Funkcja zabija proces """
+        import subprocess
         subprocess.run('kill %d' % self.pid, shell=True, check=True)
 
     def change_priority(self, priority):
         """ Funkcja zmienia priorytet procesu """
+        import subprocess
         subprocess.run('sudo renice %d %d' % (priority, self.pid), shell=True, check=True)
 
 
+def refresh_process(pid, proc, plan):
+    """ Funkcja odświeża dane procesu o podanym pid zgodnie z planem. proc to obiekt z poprzedniej aktualizacji lub None.
+        Zwraca parę (proces, wynik) gdzie wynik to jedna ze stałych REFRESH_*, a proces jest None jeżeli proces zakończył działanie """
+
+    result = REFRESH_ADDED
+    try:
+        if proc is not None:
+            starttime = proc.stat.starttime
+            result = REFRESH_UNCHANGED
+            if proc.update_stat():
+                # Ten sam numer pid może zostać przydzielony nowemu procesowi
+                if proc.stat.starttime == starttime:
+                    result = REFRESH_CHANGED
+                else:
+                    proc, result = None, REFRESH_REPLACED
+
+        if proc is None:
+            proc = Process(pid)
+
+        # Odczytanie pozostałych danych wymaganych przez plan
+        proc.collect(plan)
+    except (FileNotFoundError, ProcessLookupError):
+        # Proces zakończył się w trakcie odczytu
+        return None, REFRESH_GONE
+
+    return proc, result
+
+
+def refresh_processes(items, plan):
+    """ Funkcja odświeża listę par (pid, poprzedni obiekt procesu), zwraca listę wyników refresh_process
+        i czas procesora zużyty przez wątek """
+    start = time.thread_time()
+    results = [refresh_process(pid, proc, plan) for pid, proc in items]
+    return results, time.thread_time() - start
+
+
+class CollectionStats:
+    """ Statystyki ostatniego zbierania danych o procesach """
+
+    def __init__(self, processes=0, workers=1, wall_time=0.0, cpu_time=0.0):
+        """ Funkcja zapisuje liczbę procesów, liczbę wątków roboczych, czas rzeczywisty i łączny czas procesora w sekundach """
+        self.processes = processes
+        self.workers = workers
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+
+    def __repr__(self):
+        return "CollectionStats[processes: %d, workers: %d, wall: %.4f s, cpu: %.4f s]" % (self.processes, self.workers, self.wall_time, self.cpu_time)
+
+
+class SerialCollector:
+    """ Domyślny sposób zbierania danych - wszystkie procesy odczytywane są kolejno w bieżącym wątku """
+
+    def __init__(self):
+        self.last_stats = CollectionStats()
+
+    def collect(self, items, plan):
+        """ Funkcja odświeża listę par (pid, poprzedni obiekt procesu) i zwraca listę wyników refresh_process w tej samej kolejności """
+        start = time.perf_counter()
+        results, cpu_time = refresh_processes(items, plan)
+        self.last_stats = CollectionStats(len(items), 1, time.perf_counter() - start, cpu_time)
+        return results
+
+    def close(self):
+        """ Funkcja zwalnia zasoby, w tym przypadku nie ma czego zwalniać """
+        pass
+
+
+class ParallelCollector(SerialCollector):
+    """ Sposób zbierania danych dzielący listę procesów na części odczytywane równolegle w puli wątków lub procesów.
+        Statystyki last_stats pozwalają porównać czas rzeczywisty z czasem procesora i dobrać liczbę wątków """
+
+    def __init__(self, workers=None, use_processes=False, chunks_per_worker=4):
+        """ Funkcja zapamiętuje ustawienia, pula tworzona jest przy pierwszym użyciu. W puli procesów obiekty
+            są przesyłane bez powiązań w drzewie, a wyniki przepisywane do obiektów z poprzedniej aktualizacji """
+        SerialCollector.__init__(self)
+        self.workers = workers if workers else os.cpu_count() or 1
+        self.use_processes = use_processes
+        self.chunks_per_worker = chunks_per_worker
+        self.executor = None
+
+    def collect(self, items, plan):
+        """ Funkcja odświeża listę par (pid, poprzedni obiekt procesu) i zwraca listę wyników refresh_process w tej samej kolejności """
+        if self.executor is None:
+            # Pule importowane są dopiero przy pierwszym użyciu, by nie spowalniać importu modułu
+            from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+            executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self.executor = executor_class(max_workers=self.workers)
+
+        start = time.perf_counter()
+
+        # Podział na ciągłe fragmenty, by zachować kolejność wyników
+        chunk_size = max(1, -(-len(items) // (self.workers * self.chunks_per_worker)))
+        chunks = [items[i:i+chunk_size] for i in range(0, len(items), chunk_size)]
+
+        results = []
+        cpu_time = 0.0
+        for chunk_results, chunk_cpu_time in self.executor.map(refresh_processes, chunks, [plan] * len(chunks)):
+            results.extend(chunk_results)
+            cpu_time += chunk_cpu_time
+
+        self.last_stats = CollectionStats(len(items), self.workers, time.perf_counter() - start, cpu_time)
+        return results
+
+    def close(self):
+        """ Funkcja zamyka pulę wątków lub procesów """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+class ProcessesDiff:
+    """ Klasa opisująca zmiany w zbiorze procesów pomiędzy dwoma kolejnymi aktualizacjami """
+
+    def __init__(self, added=None, removed=None, changed=None):
+        """ Funkcja inicjuje listy procesów nowych, zakończonych i takich których dane się zmieniły """
+        self.added = added if added is not None else []
+        self.removed = removed if removed is not None else []
+        self.changed = changed if changed is not None else []
+
+    def __bool__(self):
+        """ Różnica jest prawdziwa jeżeli zawiera jakąkolwiek zmianę """
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return "ProcessesDiff[added: %d, removed: %d, changed: %d]" % (len(self.added), len(self.removed), len(self.changed))
+
+
 class Processes:
     """ Klasa reprezentująca całą herarchię procesów """
 
-    def __init__(self):
-        """ Funkcja inicjująca pusty obiekt i wywołująca aktualizację by zawierał dane o procesach """
+    def __init__(self, pid_source=None, incremental=True, collector=None):
+        """ Funkcja inicjująca pusty obiekt i wywołująca aktualizację by zawierał dane o procesach.
+            Opcjonalnie można przekazać własne źródło numerów pid, domyślnie jest to katalog /proc.
+            W trybie przyrostowym obiekty procesów są zachowywane pomiędzy aktualizacjami.
+            Collector odczytuje dane procesów, domyślnie robi to kolejno SerialCollector """
         self.all = []
+        self.by_pid = {}
+        self.orphans = []
         self.init = None
         self.max_pid = self.get_max_pid()
+        self.pid_source = pid_source if pid_source is not None else ProcDirPidSource()
+        self.plan = CollectionPlan()
+        self.collector = collector if collector is not None else SerialCollector()
+        self.incremental = incremental
+        self.last_diff = ProcessesDiff()
+        self.listeners = []
+        self.update_lock = threading.Lock()
 
     def __repr__(self):
         """ Funkcja wypisuje informacje o wszystkich procesach """
@@ -432,49 +829,130 @@ class Processes:
         """ Funkcja robi to samo co repr """
         return self.__repr__()
 
-    def update(self):
-        """ Funkcja pobierająca aktualne procesy i porządkująca je """
-        self.update_processes()
-        self.update_processes_tree()
-
-    def update_processes(self):
-        """ Funkcja aktualizująca pole all zawierające zbiór wszystkich procesów """
+    def subscribe(self, listener):
+        """ Funkcja rejestruje funkcję wywoływaną z obiektem ProcessesDiff po każdej aktualizacji """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """ Funkcja wyrejestrowuje funkcję przekazaną wcześniej do subscribe """
+        self.listeners.remove(listener)
+
+    def update(self, plan=None):
+        """ Funkcja pobierająca aktualne procesy i porządkująca je, zwraca różnicę względem poprzedniego stanu.
+            Plan określa jakie dane odczytać dla każdego procesu, domyślnie używany jest plan z pola plan """
+        diff = self._refresh(plan)
+        self._notify(diff)
+        return diff
+
+    async def aupdate(self, plan=None, runner=None):
+        """ Asynchroniczna wersja update - odczyty wykonywane są w puli wątków, a funkcje z subscribe
+            wywoływane są w wątku pętli zdarzeń. Runner to obiekt aio.BlockingRunner, domyślnie wspólny """
+        runner = runner if runner is not None else aio.default_runner
+        diff = await runner.run(self._refresh, plan)
+        self._notify(diff)
+        return diff
+
+    def _refresh(self, plan):
+        """ Funkcja odczytuje procesy i buduje drzewo, blokada chroni przed jednoczesnymi aktualizacjami z wielu wątków """
+        with self.update_lock:
+            diff = self.update_processes(plan)
+            self.update_processes_tree()
+            self.last_diff = diff
+        return diff
+
+    def _notify(self, diff):
+        """ Funkcja przekazuje różnicę zarejestrowanym funkcjom """
+        for listener in self.listeners:
+            listener(diff)
+
+    def update_processes(self, plan=None):
+        """ Funkcja aktualizująca pole all zawierające zbiór wszystkich procesów i zwracająca obiekt ProcessesDiff.
+            Procesy które nadal istnieją są ponownie wykorzystywane, odświeżane są tylko ich dane """
+
+        plan = self.plan if plan is None else plan
 
         # Znalezienie numerów pid wszystkich istniejących procesów
-        pids = []
-        for i in range(1, self.max_pid):
-            if os.path.exists("/proc/"+str(i)):
-                pids.append(i)
+        pids = self.pid_source.list_pids()
+
+        previous = self.by_pid if self.incremental else {}
+        diff = ProcessesDiff()
+        if not self.incremental:
+            diff.removed.extend(self.all)
+
+        # Odczytanie danych wszystkich procesów przez wybrany sposób zbierania
+        items = [(pid, previous.pop(pid, None)) for pid in pids]
+        results = self.collector.collect(items, plan)
 
-        # Stworzenie obiektu procesu dla każdego znalezionego pid
         self.all = []
-        for pid in pids:
-            try:
-                self.all.append(Process(pid))
-            except FileNotFoundError:
+        self.by_pid = {}
+        for (pid, old_proc), (proc, result) in zip(items, results):
+            if result == REFRESH_GONE:
+                if old_proc is not None:
+                    diff.removed.append(old_proc)
                 continue
-        return pids
+
+            if result == REFRESH_ADDED:
+                diff.added.append(proc)
+            elif result == REFRESH_REPLACED:
+                diff.removed.append(old_proc)
+                diff.added.append(proc)
+            else:
+                # Wyniki z puli procesów są kopiami, przepisujemy je do obiektu z poprzedniej aktualizacji
+                if proc is not old_proc:
+                    old_proc.update_from(proc)
+                    proc = old_proc
+                if result == REFRESH_CHANGED:
+                    diff.changed.append(proc)
+
+            self.all.append(proc)
+            self.by_pid[pid] = proc
+
+        # Procesy których nie znaleziono w /proc zakończyły działanie
+        diff.removed.extend(previous.values())
+        return diff
 
     def update_processes_tree(self):
-        """ Funkcja tworząca/aktualizująca drzewo procesów i umieszczająca w self.init proces nadrzędny - korzeń drzewa """
+        """ Funkcja tworząca/aktualizująca drzewo procesów i umieszczająca w self.init proces nadrzędny - korzeń drzewa.
+            Drzewo budowane jest w jednym przejściu, rodzice wyszukiwani są w indeksie by_pid """
+
+        # Znalezienie procesu init i zachowanie go, w kontenerze może go nie być
+        self.init = self.by_pid.get(INIT_PROCESS_PID)
+        self.orphans = []
+
+        # Obiekty procesów są ponownie wykorzystywane, więc dotychczasowe powiązania trzeba usunąć
+        for proc in self.all:
+            proc.parent = None
+            proc.children.clear()
+
         for proc in self.all:
             proc_parent_pid = proc.get_parent_pid()
 
             # Zdarzy się to zapewne dla procesu init - jednak procesu o numerze pid 0 nie ma w folderze proc
             if proc_parent_pid == SCHEDULER_PROCESS_PID:
                 continue
-            parent_process = self.all[self.all.index(proc_parent_pid)]
+
+            parent_process = self.by_pid.get(proc_parent_pid)
+
+            # Rodzic mógł zakończyć działanie między odczytami - tak jak jądro, podpinamy sierotę pod init
+            if parent_process is None:
+                self.orphans.append(proc)
+                parent_process = self.init
+                if parent_process is None:
+                    continue
+
+            proc.parent = parent_process
             parent_process.children.append(proc)
 
-        # Znalezienie procesu init i zachowanie go
-        self.init = self.all[self.all.index(INIT_PROCESS_PID)]
+    def to_table(self, with_statm=False, with_owner=False, with_io=False):
+        """ Funkcja zwraca aktualny stan w postaci kolumnowej tabeli ProcessTable opartej na tablicach NumPy """
+
+        # Import wewnątrz funkcji, bo moduł snapshot sam importuje ten moduł
+        from snapshot import ProcessTable
+        return ProcessTable.from_processes(self, with_statm, with_owner, with_io)
 
     def get_process_by_pid(self, pid):
         """ Funkcja zwraca obiekt procesu o podanym numerze pid lub None jeżeli taki nie istnieje """
-        try:
-            return self.all[self.all.index(pid)]
-        except ValueError:
-            return None
+        return self.by_pid.get(pid)
 
     @staticmethod
     def get_max_pid():
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtCore import *
+from resources import convert_bytes_to_readable_form
+
+
+class ProcessNode:
+    """ Węzeł drzewa przechowywanego przez model - proces, jego rodzic w drzewie, dzieci i numer wiersza u rodzica.
+        Pole fetched mówi czy dzieci węzła zostały już udostępnione widokowi """
+
+    __slots__ = ('pid', 'proc', 'parent', 'children', 'row', 'fetched')
+
+    def __init__(self, pid, proc):
+        self.pid = pid
+        self.proc = proc
+        self.parent = None
+        self.children = []
+        self.row = 0
+        self.fetched = False
+
+
+class ProcessTreeModel(QAbstractItemModel):
+    """ Model drzewa procesów aktualizowany różnicowo - w każdym cyklu wstawiane, usuwane i odświeżane są
+        tylko wiersze procesów które się zmieniły, więc widok zachowuje zaznaczenie, rozwinięcia i przewinięcie.
+        Dzieci węzła są udostępniane widokowi dopiero przy rozwinięciu (canFetchMore/fetchMore), więc zmiany
+        w zwiniętych poddrzewach nie powodują żadnych sygnałów ani formatowania tekstów """
+
+    COLUMNS = ['Name', 'PID', 'Owner', 'State', 'CPU', 'Memory', 'Priority', 'Nice', 'Num Threads', 'Session ID', 'TTY Nr',
+               'VM Size', 'OOM Score', 'Disk Read', 'Disk Write', 'IO Calls']
+
+    def __init__(self):
+        """ Tworzy pusty model """
+        QAbstractItemModel.__init__(self)
+        self.root = ProcessNode(None, None)
+        self.root.fetched = True
+        self.nodes = {}
+        self.usage = {}
+        self.io = {}
+        self.busy_pids = set()
+
+    # Interfejs QAbstractItemModel
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = parent.internalPointer() if parent.isValid() else self.root
+        if node.fetched and 0 <= row < len(node.children) and 0 <= column < len(self.COLUMNS):
+            return self.createIndex(row, column, node.children[row])
+        return QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = parent.internalPointer() if parent.isValid() else self.root
+        return len(node.children) if node.fetched else 0
+
+    def hasChildren(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return False
+        node = parent.internalPointer() if parent.isValid() else self.root
+        return bool(node.children)
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return False
+        node = parent.internalPointer()
+        return not node.fetched and bool(node.children)
+
+    def fetchMore(self, parent):
+        """ Udostępnia widokowi dzieci rozwijanego węzła """
+        if not self.canFetchMore(parent):
+            return
+        node = parent.internalPointer()
+        self.beginInsertRows(parent, 0, len(node.children) - 1)
+        node.fetched = True
+        self.endInsertRows()
+
+    def release(self, index):
+        """ Ukrywa przed widokiem dzieci zwiniętego węzła i jego potomków, przy rozwinięciu zostaną pobrane ponownie """
+        if not index.isValid():
+            return
+        node = index.internalPointer()
+        if not node.fetched:
+            return
+        if node.children and self._is_visible(node):
+            self.beginRemoveRows(index, 0, len(node.children) - 1)
+            self._unfetch(node)
+            self.endRemoveRows()
+        else:
+            self._unfetch(node)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.UserRole):
+            return None
+        text, value = self._cell(index.internalPointer(), self.COLUMNS[index.column()])
+        return text if role == Qt.DisplayRole else value
+
+    # Aktualizacja różnicowa
+
+    def apply(self, snapshot):
+        """ Funkcja nanosi na model różnicę z niezmiennej migawki ProcessesSnapshot """
+
+        by_pid = snapshot.by_pid
+        diff = snapshot.diff
+        usage = self.usage = snapshot.usage
+        self.io = snapshot.io
+        detached = []
+
+        # Usunięcie zakończonych procesów, ich dzieci są odłączane i zostaną podpięte pod nowych rodziców
+        for proc in diff.removed.values():
+            node = self.nodes.get(proc.pid)
+            current = by_pid.get(proc.pid)
+            if node is None or current is not None and current.get_identity() == node.proc.get_identity():
+                continue
+            if node.children:
+                detached.extend(self._detach_rows(node, 0, len(node.children) - 1))
+            if node.parent is not None:
+                self._detach_rows(node.parent, node.row, node.row)
+            del self.nodes[proc.pid]
+
+        # Nowe procesy dostają węzły, które są podpinane razem z odłączonymi dziećmi usuniętych procesów
+        for proc in diff.added.values():
+            node = self.nodes.get(proc.pid)
+            if node is not None:
+                node.proc = proc
+                continue
+            node = self.nodes[proc.pid] = ProcessNode(proc.pid, proc)
+            detached.append(node)
+
+        for node in detached:
+            if self.nodes.get(node.pid) is node:
+                self._attach(node, self._target_parent(node))
+
+        # Zmienione procesy mogą mieć nowego rodzica, a ich wiersze trzeba odświeżyć
+        for proc in diff.changed.values():
+            node = self.nodes.get(proc.pid)
+            if node is None:
+                continue
+            node.proc = proc
+            target = self._target_parent(node)
+            if target is not node.parent:
+                self._move(node, target)
+            self._row_changed(node)
+
+        # Procesy które zużywały procesor lub wykonywały operacje wejścia/wyjścia w poprzednim cyklu mogą mieć teraz
+        # inne zużycie mimo niezmienionego pliku stat
+        busy_pids = {pid for pid, (cpu_percent, _) in usage.items() if cpu_percent > 0}
+        busy_pids.update(self.io)
+        for pid in (self.busy_pids | busy_pids).difference(diff.changed):
+            node = self.nodes.get(pid)
+            if node is not None:
+                self._row_changed(node)
+        self.busy_pids = busy_pids
+
+    def index_of(self, pid, column=0):
+        """ Zwraca indeks wiersza procesu o podanym pid lub nieprawidłowy indeks jeżeli go nie ma """
+        node = self.nodes.get(pid)
+        if node is None or not self._is_visible(node):
+            return QModelIndex()
+        return self.createIndex(node.row, column, node)
+
+    def pid_of(self, index):
+        """ Zwraca pid procesu w podanym wierszu """
+        return index.internalPointer().pid
+
+    # Funkcje pomocnicze
+
+    def _target_parent(self, node):
+        """ Zwraca węzeł pod który powinien zostać podpięty węzeł, na podstawie rodzica zapisanego w rekordzie migawki """
+        parent_pid = node.proc.parent_pid
+        if parent_pid is None:
+            return self.root
+        return self.nodes.get(parent_pid, self.root)
+
+    def _children_visible(self, node):
+        """ Sprawdza czy widok zna dzieci węzła - węzeł i wszyscy jego przodkowie muszą być podpięci i pobrani """
+        while node is not self.root:
+            if node.parent is None or not node.fetched:
+                return False
+            node = node.parent
+        return True
+
+    def _is_visible(self, node):
+        """ Sprawdza czy widok zna węzeł """
+        return node.parent is not None and self._children_visible(node.parent)
+
+    def _unfetch(self, node):
+        """ Oznacza węzeł i jego potomków jako niepobrane """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.fetched:
+                node.fetched = False
+                stack.extend(node.children)
+
+    def _parent_index(self, node):
+        """ Zwraca indeks węzła, dla korzenia indeks nieprawidłowy """
+        if node is self.root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def _detach_rows(self, parent, first, last):
+        """ Odłącza wiersze first..last od rodzica i zwraca odłączone węzły razem z ich poddrzewami """
+        visible = self._children_visible(parent)
+        if visible:
+            self.beginRemoveRows(self._parent_index(parent), first, last)
+
+        removed = parent.children[first:last+1]
+        del parent.children[first:last+1]
+        for node in removed:
+            node.parent = None
+        for row in range(first, len(parent.children)):
+            parent.children[row].row = row
+
+        if visible:
+            self.endRemoveRows()
+        elif not parent.children:
+            # Widok musi usunąć znacznik rozwijania przy węźle który stracił ostatnie dziecko
+            self._row_changed(parent)
+        return removed
+
+    def _attach(self, node, parent):
+        """ Dołącza węzeł na końcu listy dzieci rodzica, sygnały wysyłane są tylko gdy widok zna dzieci rodzica """
+        visible = self._children_visible(parent)
+        row = len(parent.children)
+        if visible:
+            self.beginInsertRows(self._parent_index(parent), row, row)
+
+        node.parent = parent
+        node.row = row
+        parent.children.append(node)
+
+        if visible:
+            self.endInsertRows()
+        elif row == 0:
+            # Widok musi dodać znacznik rozwijania przy węźle który dostał pierwsze dziecko
+            self._row_changed(parent)
+
+    def _move(self, node, target):
+        """ Przenosi węzeł razem z poddrzewem pod innego rodzica """
+        source = node.parent
+        if source is None or not (self._children_visible(source) and self._children_visible(target)):
+            if source is not None:
+                self._detach_rows(source, node.row, node.row)
+            self._attach(node, target)
+            return
+
+        # Węzeł nie może zostać przeniesiony do własnego poddrzewa
+        ancestor = target
+        while ancestor is not self.root:
+            if ancestor is node:
+                return
+            ancestor = ancestor.parent
+
+        row = node.row
+        self.beginMoveRows(self._parent_index(source), row, row, self._parent_index(target), len(target.children))
+        del source.children[row]
+        for sibling_row in range(row, len(source.children)):
+            source.children[sibling_row].row = sibling_row
+        node.parent = target
+        node.row = len(target.children)
+        target.children.append(node)
+        self.endMoveRows()
+
+    def _row_changed(self, node):
+        """ Informuje widok o zmianie danych w wierszu węzła """
+        if node is not self.root and self._is_visible(node):
+            self.dataChanged.emit(self.createIndex(node.row, 0, node), self.createIndex(node.row, len(self.COLUMNS) - 1, node))
+
+    def _cell(self, node, column):
+        """ Zwraca parę (tekst, wartość do sortowania) dla komórki węzła w podanej kolumnie """
+        proc = node.proc
+        stat = proc.stat
+
+        if column == 'Name':
+            return stat.comm, stat.comm
+        if column == 'PID':
+            return str(proc.pid), proc.pid
+        if column == 'Owner':
+            owner = proc.owner[1] if proc.owner is not None else ''
+            return owner, owner
+        if column == 'State':
+            state = proc.get_readable_state()
+            return state, state
+        if column == 'CPU':
+            cpu_percent = self.usage.get(proc.pid, (0.0, 0))[0]
+            return '%.1f %%' % cpu_percent, cpu_percent
+        if column == 'Memory':
+            rss_bytes = self.usage.get(proc.pid, (0.0, 0))[1]
+            return convert_bytes_to_readable_form(rss_bytes), float(rss_bytes)
+        if column == 'Priority':
+            return str(stat.priority), stat.priority
+        if column == 'Nice':
+            return str(stat.nice), stat.nice
+        if column == 'Num Threads':
+            return str(stat.num_threads), stat.num_threads
+        if column == 'Session ID':
+            return str(stat.session), stat.session
+        if column == 'TTY Nr':
+            return str(stat.tty_nr), stat.tty_nr
+        if column == 'VM Size':
+            return convert_bytes_to_readable_form(stat.vsize), float(stat.vsize)
+        if column == 'OOM Score':
+            oom_score = proc.oom[1] if proc.oom is not None else 0
+            return str(oom_score), oom_score
+        if column == 'Disk Read':
+            read_bytes = self.io.get(proc.pid, (0.0, 0.0, 0.0))[0]
+            return convert_bytes_to_readable_form(read_bytes) + '/s', read_bytes
+        if column == 'Disk Write':
+            write_bytes = self.io.get(proc.pid, (0.0, 0.0, 0.0))[1]
+            return convert_bytes_to_readable_form(write_bytes) + '/s', write_bytes
+        if column == 'IO Calls':
+            syscalls = self.io.get(proc.pid, (0.0, 0.0, 0.0))[2]
+            return '%.0f /s' % syscalls, syscalls
+        return '', None
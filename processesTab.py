@@ -1,21 +1,21 @@
 from PySide2.QtWidgets import *
 from PySide2.QtCore import *
-from data import data
-from resources import convert_bytes_to_readable_form
+from processes import CollectionPlan
+from processesModel import ProcessTreeModel
 
 
 class ProcessesTab(QWidget):
     """ Zakładka processes """
 
-    def __init__(self):
-        """ Dodawanie komponentów do zakładki """
+    def __init__(self, data):
+        """ Dodawanie komponentów do zakładki, dane pochodzą z obiektu DataPack """
         QWidget.__init__(self)
 
         self.layout = QHBoxLayout()
         self.layout.setMargin(0)
         self.setLayout(self.layout)
 
-        self.processesPanel = ProcessesPanel()
+        self.processesPanel = ProcessesPanel(data)
         self.detailsPanel = DetailsPanel()
 
         self.layout.addWidget(self.processesPanel)
@@ -35,142 +35,114 @@ class DetailsPanel(QWidget):
 class ProcessesPanel(QWidget):
     """ lewy panel z listą procesów """
 
-    LABELS = ['Name', 'PID', 'Owner', 'State', 'Memory', 'Priority', 'Nice']
+    # Dane procesu które trzeba odczytać by wypełnić kolumnę, kolumny których tu nie ma korzystają tylko z pliku stat
+    COLUMN_FIELDS = {'Owner': ('owner',), 'OOM Score': ('oom',), 'Disk Read': ('io',), 'Disk Write': ('io',), 'IO Calls': ('io',)}
 
-    def __init__(self):
-        """ Dodawanie komponentów """
+    # Dane które zmieniają się powoli i są odświeżane rzadziej niż drzewo procesów
+    SLOW_FIELDS = ('oom',)
+
+    def __init__(self, data):
+        """ Dodawanie komponentów, migawki procesów odbierane są z obiektu DataPack """
         QWidget.__init__(self)
+        self.data = data
 
         # Otwarte węzły w drzewie
         self.opened_items = {1}
 
         # Kolumny które mają być wyświetlane
-        self.columns = {'Name': True, 'PID': True, 'Owner': True, 'State': True, 'Memory': False, 'Priority': False, 'Nice': False, 'Num Threads': False, 'Session ID': False, 'TTY Nr': False,
-                        'VM Size': True, 'OOM Score': False}
+        self.columns = {'Name': True, 'PID': True, 'Owner': True, 'State': True, 'CPU': True, 'Memory': False, 'Priority': False, 'Nice': False, 'Num Threads': False, 'Session ID': False, 'TTY Nr': False,
+                        'VM Size': True, 'OOM Score': False, 'Disk Read': False, 'Disk Write': False, 'IO Calls': False}
 
         self.layout = QVBoxLayout()
         self.layout.setMargin(0)
         self.setLayout(self.layout)
 
-        self.treeWidget = QTreeWidget(None)
-        self.treeWidget.setIndentation(11)
-        self.treeWidget.setStyleSheet("""QTreeWidget { border-style: none; }
-                                      QScrollBar::handle:vertical { border: none }""")
-        self.layout.addWidget(self.treeWidget)
+        # Model aktualizowany różnicowo i model pośredni odpowiedzialny za sortowanie
+        self.model = ProcessTreeModel()
+        self.proxy = QSortFilterProxyModel()
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setSortRole(Qt.UserRole)
+        self.proxy.setDynamicSortFilter(True)
+
+        self.treeView = QTreeView(None)
+        self.treeView.setModel(self.proxy)
+        self.treeView.setIndentation(11)
+        self.treeView.setUniformRowHeights(True)
+        self.treeView.setStyleSheet("""QTreeView { border-style: none; }
+                                    QScrollBar::handle:vertical { border: none }""")
+        self.layout.addWidget(self.treeView)
 
         # Ustawianie nagłówków w liście
-        self.treeWidget.setColumnCount(len(self.LABELS))
-        self.treeWidget.setHeaderLabels(self.LABELS)
-        self.treeWidget.setColumnWidth(0, 200)
+        self.treeView.setColumnWidth(0, 200)
+        self.treeView.setSortingEnabled(True)
+        self.treeView.sortByColumn(-1, Qt.AscendingOrder)
+        self._set_proper_columns(self.columns)
 
         # Połączenie
-        self.treeWidget.itemExpanded.connect(self.add_item)
-        self.treeWidget.itemCollapsed.connect(self.remove_item)
+        self.treeView.expanded.connect(self.add_item)
+        self.treeView.collapsed.connect(self.remove_item)
 
-        # Połączenie
-        data.processes_changed.connect(self.refresh)
+        # Połączenie, migawki są zawsze odbierane w wątku gui
+        self.data.processes_changed.connect(self.refresh, Qt.QueuedConnection)
+        self.data.processes.plan = self.get_collection_plan()
 
     @Slot(str, bool)
     def set_column_visible(self, column, visibility):
         """ Funkca pokazuje lub chowa daną kolumnę """
         self.columns[column] = visibility
+        self._set_proper_columns(self.columns)
+        self.data.processes.plan = self.get_collection_plan()
+
+    def get_collection_plan(self):
+        """ Funkcja zwraca plan zbierania danych zawierający tylko dane potrzebne widocznym kolumnom """
+        fields = []
+        for column, visible in self.columns.items():
+            if visible:
+                fields.extend(self.COLUMN_FIELDS.get(column, ()))
+        return CollectionPlan(fields, [field for field in fields if field in self.SLOW_FIELDS])
 
     @Slot(object)
-    def add_item(self, item):
-        """ Funkcja dodaje przekazany węzeł do listy otwartych """
-        pid = int(item.text(1))
+    def add_item(self, index):
+        """ Funkcja dodaje przekazany węzeł do listy otwartych i ponownie rozwija jego otwarte wcześniej dzieci """
+        source_index = self.proxy.mapToSource(index)
+        pid = self.model.pid_of(source_index)
         self.opened_items.add(pid)
 
-    @Slot(object)
-    def remove_item(self, item):
-        """ Funkcja usuła przekazany węzeł z listy otwartych """
-        pid = int(item.text(1))
-        self.opened_items.difference_update({pid})
+        # Zwinięcie węzła zwalnia jego poddrzewo, więc pobrane ponownie dzieci są zwinięte - rozwijamy te które były
+        # otwarte, a ich rozwinięcie wywoła tę funkcję dla kolejnego poziomu. Widok może odłożyć pobranie dzieci
+        # do najbliższego układania wierszy, dlatego pobieramy je od razu
+        if self.model.canFetchMore(source_index):
+            self.model.fetchMore(source_index)
+        for row in range(self.model.rowCount(source_index)):
+            child = self.model.index(row, 0, source_index)
+            if self.model.pid_of(child) in self.opened_items:
+                self.treeView.expand(self.proxy.mapFromSource(child))
 
     @Slot(object)
-    def refresh(self, processes):
-        """ Funkcja aktualizuje listę procesów """
-
-        self.treeWidget.clear()
-
-        self._set_proper_labels(self.columns)
-
-        # Tworzenie wpisu dla procesu Init
-        init_proc = processes.init
-        item = QTreeWidgetItem(None)
-        self._fill_tree_item(item, init_proc, self.columns)
-        self.treeWidget.insertTopLevelItem(0, item)
-        item.setExpanded(1 in self.opened_items)
-
-        # Tworzenie wpisów dla reszty procesów
-        self._create_tree_recur(item, init_proc, self.columns)
-
-    def _create_tree_recur(self, parentitem, proc, columns):
-        """ Funkcja w rekurencyjny sposób tworzy drzewo procesów """
-
-        for child in proc.children:
-            item = QTreeWidgetItem(parentitem)
-            self._fill_tree_item(item, child, columns)
-            self._create_tree_recur(item, child, columns)
-            item.setExpanded(child.pid in self.opened_items)
-
-    def _set_proper_labels(self, columns):
-        """ Funkcja ustawia odpowiednie nazwy kolumn """
-
-        labels = [column for column in columns if columns[column]]
-        self.treeWidget.setColumnCount(len(labels))
-        self.treeWidget.setHeaderLabels(labels)
-
-    def _fill_tree_item(self, item, proc, columns):
-        """ Funkcja uzupełnia węzeł drzewa biorąc pod uwagę dane procesu i wybrane kolumny """
-
-        nr = 0
-
-        if columns['Name']:
-            item.setText(nr, proc.stat['comm'])
-            nr += 1
-
-        if columns['PID']:
-            item.setText(nr, str(proc.pid))
-            nr += 1
-
-        if columns['Owner']:
-            item.setText(nr, proc.get_owner()[1])
-            nr += 1
-
-        if columns['State']:
-            item.setText(nr, proc.get_readable_state())
-            nr += 1
-
-        if columns['Memory']:
-            item.setText(nr, '0')
-            nr += 1
-
-        if columns['Priority']:
-            item.setText(nr, proc.stat['priority'])
-            nr += 1
-
-        if columns['Nice']:
-            item.setText(nr, proc.stat['nice'])
-            nr += 1
+    def remove_item(self, index):
+        """ Funkcja usuła przekazany węzeł z listy otwartych i zwalnia wiersze jego zwiniętego poddrzewa """
+        source_index = self.proxy.mapToSource(index)
+        pid = self.model.pid_of(source_index)
+        self.opened_items.difference_update({pid})
+        self.model.release(source_index)
 
-        if columns['Num Threads']:
-            item.setText(nr, proc.stat['num_threads'])
-            nr += 1
+    @Slot()
+    def refresh(self):
+        """ Funkcja odbiera najnowszą migawkę procesów i nanosi zmiany na drzewo """
 
-        if columns['Session ID']:
-            item.setText(nr, proc.stat['session'])
-            nr += 1
+        snapshot = self.data.processes_mailbox.take()
+        if snapshot is None:
+            return
 
-        if columns['TTY Nr']:
-            item.setText(nr, proc.stat['tty_nr'])
-            nr += 1
+        self.model.apply(snapshot)
 
-        if columns['VM Size']:
-            item.setText(nr, convert_bytes_to_readable_form(int(proc.stat['vsize'])))
-            nr += 1
+        # Rozwinięcie nowych węzłów które były wcześniej otwarte
+        for proc in snapshot.diff.added.values():
+            if proc.pid in self.opened_items:
+                self.treeView.expand(self.proxy.mapFromSource(self.model.index_of(proc.pid)))
 
-        if columns['OOM Score']:
-            item.setText(nr, str(proc.read_oom_properties()[1]))
-            nr += 1
+    def _set_proper_columns(self, columns):
+        """ Funkcja pokazuje tylko wybrane kolumny """
 
+        for section, column in enumerate(ProcessTreeModel.COLUMNS):
+            self.treeView.setColumnHidden(section, not columns[column])
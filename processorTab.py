@@ -0,0 +1,100 @@
+from PySide2.QtWidgets import *
+from PySide2.QtCore import *
+from PySide2.QtGui import QColor
+from history import CPU_HISTORY_KEYS
+from charts import StackedChart
+
+
+class ProcessorTab(QWidget):
+    """ Zakładka processor - wykresy historii obciążenia wszystkich procesorów razem i każdego rdzenia osobno """
+
+    # Kolory stanów procesora na wykresach, pozostały czas do łącznego obciążenia (nice, irq, softirq) jest szary
+    COLORS = {'user': QColor(60, 180, 75), 'system': QColor(230, 25, 75), 'iowait': QColor(0, 130, 200),
+              'steal': QColor(245, 130, 48)}
+    OTHER_COLOR = QColor(170, 170, 170)
+
+    def __init__(self, data):
+        """ Dodawanie komponentów do zakładki, wykresy tworzone są po pierwszym odczycie gdy znana jest liczba procesorów """
+        QWidget.__init__(self)
+        self.data = data
+
+        self.layout = QVBoxLayout()
+        self.layout.setMargin(0)
+        self.setLayout(self.layout)
+
+        # Legenda
+        self.legend_layout = QHBoxLayout()
+        self.layout.addLayout(self.legend_layout)
+        for name, color in list(self.COLORS.items()) + [('other', self.OTHER_COLOR)]:
+            label = QLabel(name)
+            label.setStyleSheet('color: %s; font-weight: bold' % color.name())
+            self.legend_layout.addWidget(label)
+        self.legend_layout.addStretch()
+
+        # Wykresy w przewijanym obszarze
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
+        self.layout.addWidget(self.scroll_area)
+        self.charts_widget = QWidget()
+        self.charts_layout = QGridLayout()
+        self.charts_widget.setLayout(self.charts_layout)
+        self.scroll_area.setWidget(self.charts_widget)
+
+        self.charts = []
+        self.samples = None
+
+        self.data.cpu_history_changed.connect(self.refresh, Qt.QueuedConnection)
+
+    @Slot()
+    def refresh(self):
+        """ Dorysowanie nowych próbek na widocznych wykresach. Próbki dla wykresów niewidocznych (zakładka ukryta
+            lub wykres poza przewijanym obszarem) czekają w buforze i są dorysowywane gdy wykres zostanie pokazany """
+        ids, samples = self.data.cpu_history.current
+        if samples is None:
+            return
+        if samples is not self.samples:
+            self._create_charts(ids, samples)
+        if not self.isVisible():
+            return
+
+        for chart in self.charts:
+            if not chart.visibleRegion().isEmpty():
+                chart.catch_up()
+
+    def _create_charts(self, ids, samples):
+        """ Tworzy wykresy dla nowego bufora historii, np. po zmianie liczby procesorów """
+        for chart in self.charts:
+            self.charts_layout.removeWidget(chart)
+            chart.deleteLater()
+
+        self.samples = samples
+        cpus = samples.data.shape[1]
+
+        # Numery procesorów mogą mieć przerwy gdy część rdzeni jest wyłączona
+        # Przy wielu rdzeniach wykresy układane są w kilku kolumnach, wykres wszystkich procesorów zajmuje cały wiersz
+        columns = 1 if cpus <= 5 else 2 if cpus <= 17 else 4
+        self.charts = [CpuChart('All CPUs', samples, 0, self.COLORS, self.OTHER_COLOR)]
+        self.charts_layout.addWidget(self.charts[0], 0, 0, 1, columns)
+        for cpu in range(1, cpus):
+            chart = CpuChart('CPU %d' % ids[cpu], samples, cpu, self.COLORS, self.OTHER_COLOR)
+            self.charts.append(chart)
+            self.charts_layout.addWidget(chart, 1 + (cpu - 1) // columns, (cpu - 1) % columns)
+
+        # Wolne miejsce pod wykresami, by nie były rozciągane w pionie
+        rows = 1 + -(-(cpus - 1) // columns)
+        for row in range(self.charts_layout.rowCount()):
+            self.charts_layout.setRowStretch(row, 0)
+        self.charts_layout.setRowStretch(rows, 1)
+
+
+class CpuChart(StackedChart):
+    """ Wykres historii obciążenia jednego procesora - stany ułożone jeden na drugim, dopełnione do łącznego obciążenia """
+
+    def __init__(self, title, samples, cpu, colors, other_color):
+        """ Wykres rysuje wiersz cpu próbek z bufora samples """
+        series = [(CPU_HISTORY_KEYS.index(key), color) for key, color in colors.items()]
+        StackedChart.__init__(self, title, samples, cpu, series, CPU_HISTORY_KEYS.index('load'), other_color)
+
+    def label(self):
+        load = self.last_sample[self.total] if self.last_sample is not None else 0.0
+        return '%s  %.0f %%' % (self.title, load * 100)
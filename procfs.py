@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+
+# Początkowy rozmiar bufora - pliki procesu mieszczą się w jednej stronie, większe pliki powiększają bufor
+BUFFER_SIZE = 4096
+
+
+class ProcReader:
+    """ Czytnik plików z /proc do wielokrotnie używanego bufora. Plik jest czytany przez os.open i os.preadv prosto do
+        bytearray, bez obiektów plików i dekodowania tekstu, a wynik to memoryview na bufor bez kopiowania - ważny
+        tylko do następnego odczytu. Czytnik nie może być używany przez kilka wątków naraz, dlatego każdy wątek
+        dostaje własny przez funkcję reader """
+
+    def __init__(self, size=BUFFER_SIZE):
+        """ Funkcja alokuje bufor o podanym rozmiarze """
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    def __repr__(self):
+        return "ProcReader[buffer: %d]" % len(self.buffer)
+
+    def read(self, path, single=False):
+        """ Odczytuje cały plik i zwraca memoryview z jego zawartością. Pliki tworzone przez jądro za jednym razem
+            (single, np. stat, statm, io) są zwracane w całości przez pierwszy odczyt jeśli zmieściły się w buforze,
+            więc nie trzeba czekać na odczyt zwracający 0 bajtów """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return self._read_from(fd, single)
+        finally:
+            os.close(fd)
+
+    def read_bytes(self, path, single=False):
+        """ To samo co read, ale zwraca kopię zawartości, którą można zachować """
+        return bytes(self.read(path, single))
+
+    def _read_from(self, fd, single):
+        """ Czyta plik od początku do bufora, kolejne części czytane są przez os.preadv od miejsca w którym skończyła się poprzednia """
+        length = 0
+        while True:
+            if length == len(self.buffer):
+                self._grow(length)
+            count = os.preadv(fd, (self.view[length:],), length)
+            length += count
+            if count == 0 or single and length < len(self.buffer):
+                break
+        return self.view[:length]
+
+    def _grow(self, length):
+        """ Podwaja bufor zachowując length odczytanych bajtów. Tworzony jest nowy bufor, bo stary może mieć widoki """
+        buffer = bytearray(len(self.buffer) * 2)
+        buffer[:length] = self.view[:length]
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+
+
+class ProcFile(ProcReader):
+    """ Plik z /proc otwarty na stałe i czytany od początku przez os.preadv do własnego bufora. Jądro tworzy zawartość
+        od nowa przy każdym odczycie od początku, więc kolejna próbka pliku tworzonego za jednym razem (single)
+        kosztuje jedno wywołanie systemowe zamiast open, read, read i close. Obiekt używany jest przez jeden wątek """
+
+    def __init__(self, path, single=True, size=BUFFER_SIZE):
+        """ Funkcja otwiera plik """
+        ProcReader.__init__(self, size)
+        self.path = path
+        self.single = single
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def __repr__(self):
+        return "ProcFile[%s, buffer: %d]" % (self.path, len(self.buffer))
+
+    def read(self):
+        """ Odczytuje aktualną zawartość pliku i zwraca memoryview na bufor, ważny do następnego odczytu """
+        return self._read_from(self.fd, self.single)
+
+    def read_bytes(self):
+        """ To samo co read, ale zwraca kopię zawartości """
+        return bytes(self.read())
+
+    def close(self):
+        """ Zamyka plik """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+_local = threading.local()
+
+
+def reader():
+    """ Zwraca czytnik wątku wywołującego, tworzony przy pierwszym użyciu """
+    try:
+        return _local.reader
+    except AttributeError:
+        _local.reader = ProcReader()
+        return _local.reader
+
+
+def split_stat(line):
+    """ Dzieli zawartość pliku stat na (pid, nazwa, tokeny po nazwie). Nazwa pliku wykonywalnego jest zapisana w nawiasach
+        okrągłych i może zawierać spacje, nawiasy i bajty spoza UTF-8, dlatego szukamy pierwszego nawiasu otwierającego
+        i ostatniego zamykającego, a nazwę dekodujemy zastępując niepoprawne bajty """
+    pstart, pend = line.find(b'('), line.rfind(b')')
+    return int(line[:pstart]), line[pstart+1:pend].decode('utf-8', 'replace'), line[pend+2:].split()
+
+
+def parse_ints(data):
+    """ Zwraca listę liczb rozdzielonych białymi znakami, np. z pliku statm """
+    return [int(token) for token in data.split()]
+
+
+def parse_key_values(data, keys=None):
+    """ Parsuje plik z wierszami 'klucz: liczba [kB]' (meminfo, io, smaps_rollup) do słownika klucz: liczba.
+        Gdy podano keys, zwracane są tylko te klucze, a parsowanie kończy się gdy wszystkie zostaną znalezione """
+    result = {}
+    wanted = {key.encode(): key for key in keys} if keys is not None else None
+
+    for line in data.splitlines():
+        key, _, value = line.partition(b':')
+        if wanted is None:
+            result[key.decode()] = int(value.split()[0])
+        elif key in wanted:
+            result[wanted[key]] = int(value.split()[0])
+            if len(result) == len(wanted):
+                break
+
+    return result
@@ -0,0 +1,682 @@
+# -*- coding: utf-8 -*-
+
+import json
+import mmap
+import time
+import struct
+import threading
+import numpy as np
+from processes import (STAT_KEYS, STAT_EAGER_KEYS, STATM_KEYS, Process, ProcessStat, Processes, PidSource, SerialCollector,
+                       CollectionStats, CollectionPlan, USER_NAMES, REFRESH_ADDED, REFRESH_CHANGED, REFRESH_UNCHANGED,
+                       REFRESH_REPLACED, REFRESH_GONE)
+from resources import STAT_CPU_KEYS, CpuTimes
+from snapshot import PROCESS_TABLE_COLUMNS, PID_BITS, CLOCK_TICKS
+
+# Format pliku nagrania:
+#   nagłówek pliku - FILE_MAGIC, długość i treść opisu w JSON (kolumny rekordów, klucze meminfo), wyrównanie do 8 bajtów
+#   ramki - nagłówek FRAME_HEADER i sekcje wyrównane do 8 bajtów: rekordy procesów, usunięte pid, czasy procesorów,
+#           numery procesorów (od wersji 2), wartości meminfo, nowe nazwy procesów oddzielone znakiem \0
+#   indeks - tablica INDEX_DTYPE z położeniem każdej ramki i stopka FOOTER, dopisywane przy zamknięciu nagrania
+# Klatka kluczowa zawiera wszystkie procesy i pełną listę nazw, pozostałe ramki tylko procesy zmienione od poprzedniej ramki
+FILE_MAGIC = b'TMREC\x00\x00\x01'
+FORMAT_VERSION = 2
+# Wersje które można odczytać - wersja 1 nie zapisuje numerów procesorów, więc przyjmowane są kolejne numery
+SUPPORTED_VERSIONS = (1, 2)
+FRAME_MAGIC = b'FRM1'
+INDEX_MAGIC = b'TMIX'
+
+# Znacznik, rodzaj ramki, numer, czas, długość ramki, liczba rekordów, usuniętych pid, procesorów, wartości meminfo, bajtów nazw
+FRAME_HEADER = struct.Struct('<4sB3xIdQIIIII')
+
+# Położenie indeksu, liczba ramek i znacznik
+FOOTER = struct.Struct('<QI4s')
+
+FRAME_DELTA = 0
+FRAME_KEY = 1
+
+# Co ile ramek zapisywana jest klatka kluczowa, od której można zacząć odtwarzanie
+KEYFRAME_INTERVAL = 50
+
+# Typy kolumn rekordu procesu, kolumny nie wymienione tutaj zapisywane są jako int64 - w tym liczby stron ze statm,
+# które dla procesów z dużymi rzadkimi odwzorowaniami (JVM, ASan) przekraczają zakres 32 bitów
+RECORD_TYPES = {
+    'pid': '<i4', 'ppid': '<i4', 'pgrp': '<i4', 'session': '<i4', 'tty_nr': '<i4', 'priority': '<i4', 'nice': '<i4',
+    'num_threads': '<i4', 'processor': '<i4', 'uid': '<i4', 'minflt': '<u8', 'majflt': '<u8', 'utime': '<u8',
+    'stime': '<u8', 'starttime': '<u8', 'vsize': '<u8',
+}
+
+# Rekord procesu o stałej długości - kolumny tabeli ProcessTable, identyfikator nazwy i stan
+RECORD_DTYPE = np.dtype([(name, RECORD_TYPES.get(name, '<i8')) for name in PROCESS_TABLE_COLUMNS] + [('comm_id', '<u4'), ('state', 'S1')])
+
+# Wpis indeksu ramek
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('timestamp', '<f8'), ('kind', '<u4'), ('records', '<u4')])
+
+
+def _padding(size):
+    """ Zwraca liczbę bajtów dopełniających rozmiar do wielokrotności 8 """
+    return -size % 8
+
+
+class RecordingError(Exception):
+    """ Wyjątek zgłaszany przy odczycie uszkodzonego lub nieobsługiwanego pliku nagrania """
+    pass
+
+
+class Frame:
+    """ Odczytana ramka nagrania. Rekordy są posortowane według pid, w ramce różnicowej zawierają tylko zmienione procesy """
+
+    __slots__ = ('kind', 'sequence', 'timestamp', 'records', 'removed', 'cpu_times', 'cpu_ids', 'memory', 'names')
+
+    def __init__(self, kind, sequence, timestamp, records, removed, cpu_times, cpu_ids, memory, names):
+        self.kind = kind
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.records = records
+        self.removed = removed
+        self.cpu_times = cpu_times
+        self.cpu_ids = cpu_ids
+        self.memory = memory
+        self.names = names
+
+    def __repr__(self):
+        return "Frame[%d, %s, records: %d, removed: %d]" % (self.sequence, 'key' if self.kind == FRAME_KEY else 'delta', len(self.records), len(self.removed))
+
+
+class Recorder:
+    """ Klasa dopisująca kolejne stany procesów, procesorów i pamięci do pliku nagrania. Procesy zapisywane są jako rekordy
+        o stałej długości, w ramkach różnicowych tylko te które zmieniły się od poprzedniej ramki, więc koszt zapisu
+        to kilka operacji na tablicach NumPy i jeden zapis do pliku """
+
+    # Plan zbierania wymagany przez nagrywanie - właściciel zmienia się rzadko, więc odczytywany jest jako wolne dane
+    PLAN = CollectionPlan(slow=['owner'])
+
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL):
+        """ Funkcja tworzy plik nagrania, nagłówek zapisywany jest przy pierwszej ramce gdy znane są klucze meminfo """
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.file = open(path, 'wb')
+        self.memory_keys = None
+        self.previous = None
+        self.names = {}
+        self.index = []
+        self.frames_since_keyframe = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def record(self, table, cpu_times, memory_info, timestamp=None):
+        """ Funkcja dopisuje ramkę z tabeli ProcessTable, czasów procesorów z get_cpus_times i słownika z get_memory_info.
+            Czas to czas zegara systemowego, domyślnie bieżący """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            if self.file is None:
+                raise ValueError("Recording is closed")
+            if self.memory_keys is None:
+                self.memory_keys = tuple(memory_info) if memory_info else ()
+                self._write_header()
+
+            # Klatka kluczowa zaczyna nową listę nazw, by odtwarzanie mogło od niej zacząć
+            kind = FRAME_KEY if self.previous is None or self.frames_since_keyframe >= self.keyframe_interval else FRAME_DELTA
+            if kind == FRAME_KEY:
+                self.names = {}
+                self.frames_since_keyframe = 0
+            self.frames_since_keyframe += 1
+
+            # Klatka kluczowa zawiera wszystkie procesy, ale także zakończone procesy - na potrzeby indeksu procesów
+            records, new_names = self._to_records(table)
+            changed, removed = self._delta(records) if self.previous is not None else (records, np.empty(0, dtype='<i4'))
+            if kind == FRAME_KEY:
+                changed = records
+            self.previous = records
+
+            if cpu_times is not None and not isinstance(cpu_times, CpuTimes):
+                cpu_times = CpuTimes.from_dicts(cpu_times)
+            cpus = cpu_times.counters.astype('<u8') if cpu_times is not None else np.zeros((0, len(STAT_CPU_KEYS)), dtype='<u8')
+            # Numery procesorów pozwalają przy odtwarzaniu dopasować wiersze po wyłączeniu lub włączeniu rdzenia
+            cpu_ids = np.array(cpu_times.ids if cpu_times is not None else (), dtype='<i4')
+            memory = np.array([(memory_info or {}).get(key, 0) for key in self.memory_keys], dtype='<u8')
+            names = '\0'.join(new_names).encode('utf-8')
+
+            sections = [changed.tobytes(), removed.tobytes(), cpus.tobytes(), cpu_ids.tobytes(), memory.tobytes(), names]
+            length = FRAME_HEADER.size + sum(len(section) + _padding(len(section)) for section in sections)
+            header = FRAME_HEADER.pack(FRAME_MAGIC, kind, len(self.index), timestamp, length, len(changed), len(removed),
+                                       len(cpus), len(memory), len(names))
+
+            self.index.append((self.file.tell(), timestamp, kind, len(changed)))
+            self.file.write(b''.join([header] + [section + b'\0' * _padding(len(section)) for section in sections]))
+            self.file.flush()
+
+    def close(self):
+        """ Funkcja dopisuje indeks ramek i zamyka plik """
+        with self.lock:
+            if self.file is None:
+                return
+            if self.memory_keys is None:
+                self.memory_keys = ()
+                self._write_header()
+            offset = self.file.tell()
+            self.file.write(np.array(self.index, dtype=INDEX_DTYPE).tobytes())
+            self.file.write(FOOTER.pack(offset, len(self.index), INDEX_MAGIC))
+            self.file.close()
+            self.file = None
+
+    def _write_header(self):
+        """ Funkcja zapisuje nagłówek pliku z opisem rekordów """
+        description = json.dumps({
+            'version': FORMAT_VERSION,
+            'record_fields': [[name, RECORD_DTYPE.fields[name][0].str] for name in RECORD_DTYPE.names],
+            'cpu_keys': STAT_CPU_KEYS,
+            'memory_keys': self.memory_keys,
+        }).encode('utf-8')
+        self.file.write(FILE_MAGIC + struct.pack('<I', len(description)) + description)
+        self.file.write(b'\0' * _padding(self.file.tell()))
+
+    def _to_records(self, table):
+        """ Funkcja zamienia tabelę na tablicę rekordów posortowaną według pid, zwraca ją razem z nazwami spoza listy nazw """
+        records = np.empty(len(table), dtype=RECORD_DTYPE)
+        for name in PROCESS_TABLE_COLUMNS:
+            records[name] = table[name]
+
+        new_names = [name for name in table.comm_names if name not in self.names]
+        for name in new_names:
+            self.names[name] = len(self.names)
+        ids = np.fromiter((self.names[name] for name in table.comm_names), dtype=np.uint32, count=len(table.comm_names))
+        records['comm_id'] = ids[table.comm_codes]
+        records['state'] = table.state.astype('S1')
+
+        return records[np.argsort(records['pid'], kind='stable')], new_names
+
+    def _delta(self, records):
+        """ Funkcja zwraca rekordy nowych i zmienionych procesów oraz numery pid procesów usuniętych od poprzedniej ramki """
+        previous = self.previous
+        if not len(previous):
+            return records, np.empty(0, dtype='<i4')
+
+        positions = np.searchsorted(previous['pid'], records['pid'])
+        positions[positions == len(previous)] = 0
+        unchanged = (previous['pid'][positions] == records['pid']) & (previous[positions] == records)
+        removed = np.setdiff1d(previous['pid'], records['pid'], assume_unique=True).astype('<i4')
+        return records[~unchanged], removed
+
+
+class RecordingReader:
+    """ Klasa odczytująca nagranie odwzorowane w pamięci (mmap), więc nawet wielogodzinne nagrania nie są wczytywane.
+        Rekordy, kolumny i tablice zwracane przez read_frame są widokami na odwzorowany plik, a nie kopiami.
+        Indeks czasu pozwala znaleźć ramkę dla podanej chwili, a indeks procesów (pid_index, budowany po kawałku
+        dla odcinków nagrania których dotyczą zapytania) ramki w których zapisano dany proces. Jeśli nagranie nie zostało poprawnie zamknięte, indeks ramek
+        jest odtwarzany przez przejrzenie nagłówków ramek """
+
+    def __init__(self, path):
+        """ Funkcja odwzorowuje plik w pamięci, odczytuje opis rekordów i indeks ramek """
+        self.path = path
+        with open(path, 'rb') as file:
+            try:
+                self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise RecordingError("%s is empty" % path)
+        self.size = len(self.buffer)
+
+        if self.buffer[:len(FILE_MAGIC)] != FILE_MAGIC:
+            raise RecordingError("%s is not a recording" % path)
+        length, = struct.unpack_from('<I', self.buffer, len(FILE_MAGIC))
+        start = len(FILE_MAGIC) + 4
+        self.description = json.loads(self.buffer[start:start+length].decode('utf-8'))
+        if self.description['version'] not in SUPPORTED_VERSIONS:
+            raise RecordingError("Unsupported recording version %s" % self.description['version'])
+        self.data_offset = start + length + _padding(start + length)
+
+        self.record_dtype = np.dtype([tuple(field) for field in self.description['record_fields']])
+        self.cpu_keys = tuple(self.description['cpu_keys'])
+        self.has_cpu_ids = self.description['version'] >= 2
+        self.memory_keys = tuple(self.description['memory_keys'])
+        self.bytes = np.frombuffer(self.buffer, dtype=np.uint8)
+        self.index = self._read_index()
+        self.keyframes = np.flatnonzero(self.index['kind'] == FRAME_KEY)
+        self._pid_index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        """ Liczba ramek w nagraniu """
+        return len(self.index)
+
+    def close(self):
+        """ Funkcja zwalnia odwzorowanie pliku. Jeśli istnieją jeszcze widoki na plik, zostanie ono zwolnione razem z nimi """
+        self.bytes = self.index = self.keyframes = self._pid_index = None
+        try:
+            self.buffer.close()
+        except BufferError:
+            pass
+
+    @property
+    def start_time(self):
+        """ Czas pierwszej ramki """
+        return float(self.index['timestamp'][0]) if len(self.index) else 0.0
+
+    @property
+    def end_time(self):
+        """ Czas ostatniej ramki """
+        return float(self.index['timestamp'][-1]) if len(self.index) else 0.0
+
+    @property
+    def pid_index(self):
+        """ Indeks ramek w których zapisano każdy proces, odcinki indeksu budowane są przy pierwszym zapytaniu o nie """
+        if self._pid_index is None:
+            self._pid_index = PidIndex(self)
+        return self._pid_index
+
+    def frame_at(self, timestamp):
+        """ Zwraca numer ostatniej ramki zapisanej nie później niż podany czas (liczba lub datetime),
+            lub 0 jeśli czas poprzedza nagranie """
+        timestamp = _to_timestamp(timestamp)
+        return max(0, int(np.searchsorted(self.index['timestamp'], timestamp, side='right')) - 1)
+
+    def keyframe_before(self, number):
+        """ Zwraca numer ostatniej klatki kluczowej nie późniejszej niż podana ramka """
+        return int(self.keyframes[np.searchsorted(self.keyframes, number, side='right') - 1])
+
+    def read_frame(self, number):
+        """ Funkcja zwraca ramkę o podanym numerze, jej tablice są widokami na odwzorowany plik """
+        frame_offset = int(self.index['offset'][number])
+        magic, kind, sequence, timestamp, length, records, removed, cpus, memory, names = FRAME_HEADER.unpack_from(self.buffer, frame_offset)
+        if magic != FRAME_MAGIC:
+            raise RecordingError("Corrupted frame %d" % number)
+
+        offset = frame_offset + FRAME_HEADER.size
+        sections = []
+        layout = [(self.record_dtype, records), (np.dtype('<i4'), removed), (np.dtype('<u8'), cpus * len(self.cpu_keys))]
+        if self.has_cpu_ids:
+            layout.append((np.dtype('<i4'), cpus))
+        layout.append((np.dtype('<u8'), memory))
+        for dtype, count in layout:
+            sections.append(np.frombuffer(self.buffer, dtype=dtype, count=count, offset=offset))
+            offset += count * dtype.itemsize
+            offset += _padding(offset)
+        names = self.buffer[offset:offset+names].decode('utf-8').split('\0') if names else []
+
+        cpu_ids = sections[3] if self.has_cpu_ids else np.arange(-1, cpus - 1, dtype='<i4')
+        return Frame(kind, sequence, timestamp, sections[0], sections[1], sections[2].reshape(cpus, len(self.cpu_keys)),
+                     cpu_ids, sections[-1], names)
+
+    def names_at(self, number):
+        """ Zwraca listę nazw procesów obowiązującą w podanej ramce - nazwy z klatki kluczowej i kolejnych ramek """
+        names = []
+        for frame_number in range(self.keyframe_before(number), number + 1):
+            names.extend(self.read_frame(frame_number).names)
+        return names
+
+    def state_at(self, timestamp):
+        """ Zwraca obiekt RecordedProcesses ze wszystkimi procesami zapisanymi w ostatniej ramce nie późniejszej niż podany czas """
+        number = self.frame_at(timestamp)
+        records, names = None, []
+        for frame_number in range(self.keyframe_before(number), number + 1):
+            frame = self.read_frame(frame_number)
+            records = apply_frame(records, frame)
+            names.extend(frame.names)
+        return RecordedProcesses(float(self.index['timestamp'][number]), records, np.array(names, dtype=object)[records['comm_id']])
+
+    def records_at(self, frames, rows):
+        """ Zwraca tablicę rekordów zapisanych w podanych ramkach na podanych pozycjach, bajty rekordów są wybierane
+            z odwzorowanego pliku jedną operacją, bez odczytywania całych ramek """
+        frames = np.asarray(frames, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        itemsize = self.record_dtype.itemsize
+        offsets = self.index['offset'][frames].astype(np.int64) + FRAME_HEADER.size + rows * itemsize
+        data = self.bytes[offsets[:, np.newaxis] + np.arange(itemsize)]
+        return data.view(self.record_dtype).reshape(len(frames))
+
+    def pid_history(self, pid, start=None, end=None):
+        """ Zwraca parę (czasy, rekordy) - kolejne zapisane stany procesu o podanym pid w przedziale czasu, zaczynając od stanu
+            obowiązującego w chwili start. Jeśli numer pid został ponownie użyty, rekordy różnią się polem starttime.
+            Stany powtórzone bez zmian w klatkach kluczowych są pomijane """
+        first = self.frame_at(start) if start is not None else 0
+        last = self.frame_at(end) if end is not None else len(self) - 1
+        frames, rows = self.pid_index.lookup(pid, first, last)
+
+        # Ostatni wpis przed początkiem przedziału to stan obowiązujący na jego początku, o ile nie było to zakończenie procesu
+        begin = max(0, int(np.searchsorted(frames, first, side='right')) - 1)
+        end = int(np.searchsorted(frames, last, side='right'))
+        frames, rows = frames[begin:end], rows[begin:end]
+        present = rows >= 0
+        frames, rows = frames[present], rows[present]
+        records = self.records_at(frames, rows)
+
+        # Klatka kluczowa zapisuje każdy proces, także niezmieniony. Nazwy są w niej numerowane od nowa, więc comm_id
+        # nie jest porównywany - nazwa zmienia się tylko przy exec, który zmienia też pamięć procesu
+        changed = np.zeros(len(records), dtype=bool)
+        changed[:1] = True
+        for name in records.dtype.names:
+            if name != 'comm_id':
+                changed[1:] |= records[name][1:] != records[name][:-1]
+
+        return self.index['timestamp'][frames[changed]], records[changed]
+
+    def top_cpu(self, start, end, count=10):
+        """ Zwraca parę (RecordedProcesses, procent zużycia procesora) dla count procesów które zużyły najwięcej czasu
+            procesora w przedziale. Odczytywane są tylko ramki od klatki kluczowej przed początkiem przedziału do jego końca """
+        first, last = self.frame_at(start), self.frame_at(end)
+        base = self.state_at(start).records
+
+        # Wszystkie rekordy zapisane w przedziale, czasy procesora każdego procesu tylko rosną, więc interesuje nas ostatni
+        numbers = range(first + 1, last + 1)
+        frames = [self.read_frame(number) for number in numbers]
+        window = np.concatenate([base] + [frame.records for frame in frames])
+        sources = np.repeat(np.arange(first, last + 1), [len(base)] + [len(frame.records) for frame in frames])
+
+        keys = (window['starttime'].astype(np.int64) << PID_BITS) | window['pid']
+        ticks = (window['utime'] + window['stime']).astype(np.int64)
+        order = np.lexsort((np.arange(len(window)), keys))
+        last_occurrence = order[np.append(keys[order][1:] != keys[order][:-1], True)]
+
+        # Procesy uruchomione w przedziale zużyły w nim cały swój czas procesora
+        end_keys = keys[last_occurrence]
+        started = np.zeros(len(end_keys), dtype=np.int64)
+        if len(base):
+            base_order = np.argsort(keys[:len(base)])
+            base_keys = keys[:len(base)][base_order]
+            positions = np.searchsorted(base_keys, end_keys)
+            positions[positions == len(base)] = 0
+            matched = base_keys[positions] == end_keys
+            started[matched] = ticks[:len(base)][base_order][positions[matched]]
+        used = ticks[last_occurrence] - started
+
+        # argpartition wybiera największe elementy w czasie liniowym, sortujemy tylko wybrane
+        count = min(count, len(used))
+        top = np.argpartition(used, len(used) - count)[len(used) - count:] if count else np.empty(0, dtype=np.intp)
+        top = top[np.argsort(used[top])[::-1]]
+
+        selected = last_occurrence[top]
+        records = window[selected]
+        # Nazwy odtwarzane są od klatki kluczowej, więc dla każdej ramki tylko raz
+        names_by_frame = {}
+        comm = []
+        for frame, comm_id in zip(sources[selected].tolist(), records['comm_id'].tolist()):
+            if frame not in names_by_frame:
+                names_by_frame[frame] = self.names_at(frame)
+            comm.append(names_by_frame[frame][comm_id])
+        comm = np.array(comm, dtype=object)
+
+        elapsed = float(self.index['timestamp'][last] - self.index['timestamp'][first])
+        cpu_percent = used[top] / CLOCK_TICKS / elapsed * 100 if elapsed > 0 else np.zeros(len(top))
+        return RecordedProcesses(float(self.index['timestamp'][last]), records, comm), cpu_percent
+
+    def _read_index(self):
+        """ Funkcja odczytuje indeks ze stopki pliku lub odtwarza go przeglądając ramki """
+        if self.size >= self.data_offset + FOOTER.size:
+            offset, count, magic = FOOTER.unpack_from(self.buffer, self.size - FOOTER.size)
+            if magic == INDEX_MAGIC and offset + count * INDEX_DTYPE.itemsize + FOOTER.size == self.size:
+                return np.frombuffer(self.buffer, dtype=INDEX_DTYPE, count=count, offset=offset)
+
+        # Nagranie przerwane - przechodzimy po nagłówkach ramek, niepełna ostatnia ramka jest pomijana
+        entries = []
+        offset = self.data_offset
+        while offset + FRAME_HEADER.size <= self.size:
+            magic, kind, _, timestamp, length, records, *_ = FRAME_HEADER.unpack_from(self.buffer, offset)
+            if magic != FRAME_MAGIC or offset + length > self.size:
+                break
+            entries.append((offset, timestamp, kind, records))
+            offset += length
+        return np.array(entries, dtype=INDEX_DTYPE)
+
+
+class PidIndex:
+    """ Indeks wystąpień procesów w ramkach nagrania - dla każdego pid posortowane numery ramek w których zapisano
+        jego rekord i pozycje rekordu w ramce. Zakończenie procesu zapisane jest jako pozycja -1. Indeks składa się
+        z odcinków od klatki kluczowej do następnej, budowanych przy pierwszym zapytaniu o ich ramki, więc zapytanie
+        o krótki przedział nie przegląda całego nagrania """
+
+    def __init__(self, reader):
+        """ Funkcja tworzy pusty indeks nagrania """
+        self.reader = reader
+        self.segments = {}
+
+    def __len__(self):
+        """ Liczba wpisów w zbudowanych odcinkach """
+        return sum(len(pids) for pids, _, _ in self.segments.values())
+
+    def __repr__(self):
+        return "PidIndex[segments: %d/%d, entries: %d]" % (len(self.segments), len(self.reader.keyframes), len(self))
+
+    def lookup(self, pid, first=0, last=None):
+        """ Zwraca parę tablic (numery ramek, pozycje rekordów) dla podanego pid z odcinków obejmujących ramki
+            od first do last, także wpisy odcinka przed first - od jego klatki kluczowej """
+        keyframes = self.reader.keyframes
+        last = len(self.reader) - 1 if last is None else last
+        begin = max(0, int(np.searchsorted(keyframes, first, side='right')) - 1)
+        end = int(np.searchsorted(keyframes, last, side='right'))
+
+        frames, rows = [], []
+        for segment in range(begin, end):
+            pids, segment_frames, segment_rows = self._segment(segment)
+            start, stop = np.searchsorted(pids, [pid, pid + 1])
+            frames.append(segment_frames[start:stop])
+            rows.append(segment_rows[start:stop])
+        if not frames:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(frames), np.concatenate(rows)
+
+    def _segment(self, segment):
+        """ Zwraca odcinek indeksu o podanym numerze, przy pierwszym odwołaniu przeglądając kolumny pid jego ramek """
+        if segment in self.segments:
+            return self.segments[segment]
+
+        keyframes = self.reader.keyframes
+        stop = int(keyframes[segment + 1]) if segment + 1 < len(keyframes) else len(self.reader)
+        pids, frames, rows = [], [], []
+        for number in range(int(keyframes[segment]), stop):
+            frame = self.reader.read_frame(number)
+            pids.append(frame.records['pid'])
+            pids.append(frame.removed)
+            frames.append(np.full(len(frame.records) + len(frame.removed), number, dtype=np.int64))
+            rows.append(np.arange(len(frame.records), dtype=np.int64))
+            rows.append(np.full(len(frame.removed), -1, dtype=np.int64))
+
+        pids = np.concatenate(pids).astype(np.int64)
+        frames = np.concatenate(frames)
+        rows = np.concatenate(rows)
+
+        # Zakończenie i nowy proces o tym samym pid w jednej ramce - rekord nowego procesu musi być po zakończeniu
+        order = np.lexsort((rows, frames, pids))
+        self.segments[segment] = pids[order], frames[order], rows[order]
+        return self.segments[segment]
+
+
+class RecordedProcesses:
+    """ Stan procesów odczytany z nagrania - rekordy o typie opisanym w nagraniu i odpowiadające im nazwy """
+
+    def __init__(self, timestamp, records, comm):
+        self.timestamp = timestamp
+        self.records = records
+        self.comm = comm
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return "RecordedProcesses[%s, processes: %d]" % (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.timestamp)), len(self))
+
+    def __getitem__(self, name):
+        """ Zwraca kolumnę o podanej nazwie """
+        return self.comm if name == 'comm' else self.records[name]
+
+
+def apply_frame(records, frame):
+    """ Funkcja nakłada ramkę na rekordy wszystkich procesów z poprzedniej ramki i zwraca nowe rekordy posortowane według pid.
+        Klatka kluczowa zastępuje wszystkie rekordy """
+    if frame.kind == FRAME_KEY or records is None:
+        return frame.records.copy()
+    dropped = np.isin(records['pid'], np.concatenate((frame.removed, frame.records['pid'])))
+    records = np.concatenate((records[~dropped], frame.records))
+    return records[np.argsort(records['pid'], kind='stable')]
+
+
+def _to_timestamp(value):
+    """ Zamienia datetime na czas w sekundach, liczby zwraca bez zmian """
+    return value.timestamp() if hasattr(value, 'timestamp') else value
+
+
+class Replay:
+    """ Źródło danych odtwarzające nagranie z wybraną prędkością. Udostępnia te same dane co odczyt z /proc:
+        czasy procesorów, słownik meminfo i procesy (przez create_processes), więc może zasilać gui i tryb bez gui """
+
+    def __init__(self, path, speed=1.0, offset=0.0):
+        """ Funkcja otwiera nagranie i przewija je o offset sekund od początku """
+        self.reader = RecordingReader(path)
+        if not len(self.reader):
+            raise RecordingError("%s contains no frames" % path)
+        self.speed = speed
+        self.records = None
+        self.names = []
+        self.cpu_times = None
+        self.cpu_ids = None
+        self.memory = None
+        self.timestamp = None
+        self.position = -1
+        self.recording_origin = None
+        self.clock_origin = None
+        self.lock = threading.Lock()
+        self.seek(self.reader.start_time + offset)
+
+    def __repr__(self):
+        return "Replay[%s, frame %d/%d, speed: %.2f]" % (self.reader.path, self.position + 1, len(self.reader), self.speed)
+
+    def seek(self, timestamp):
+        """ Funkcja przewija nagranie do podanego czasu - wczytuje najbliższą wcześniejszą klatkę kluczową
+            i nakłada na nią kolejne ramki różnicowe """
+        with self.lock:
+            number = self.reader.frame_at(timestamp)
+            first = self.reader.keyframe_before(number)
+            if not first <= self.position <= number:
+                self.position = first - 1
+            self._apply_until(number)
+            self.recording_origin = max(timestamp, self.reader.start_time)
+            self.clock_origin = time.monotonic()
+
+    def set_speed(self, speed):
+        """ Funkcja zmienia prędkość odtwarzania od bieżącego momentu """
+        with self.lock:
+            self.recording_origin = self._recording_time()
+            self.clock_origin = time.monotonic()
+            self.speed = speed
+
+    def advance(self):
+        """ Funkcja nakłada ramki zapisane do bieżącego czasu odtwarzania, na końcu nagrania zatrzymuje się na ostatniej ramce """
+        with self.lock:
+            self._apply_until(self.reader.frame_at(self._recording_time()))
+
+    def at_end(self):
+        """ Sprawdza czy odtworzono już ostatnią ramkę """
+        return self.position == len(self.reader) - 1
+
+    def get_cpus_times(self):
+        """ Odpowiednik resources.get_cpus_times """
+        self.advance()
+        if self.reader.cpu_keys == STAT_CPU_KEYS:
+            return CpuTimes(self.cpu_ids.tolist(), self.cpu_times.astype(np.int64))
+        return CpuTimes.from_dicts([dict(zip(self.reader.cpu_keys, cpu)) for cpu in self.cpu_times.tolist()], self.cpu_ids.tolist())
+
+    def get_memory_info(self, keys=None):
+        """ Odpowiednik resources.get_memory_info """
+        self.advance()
+        memory_info = dict(zip(self.reader.memory_keys, self.memory.tolist()))
+        return memory_info if keys is None else {key: memory_info[key] for key in keys if key in memory_info}
+
+    def create_processes(self):
+        """ Zwraca obiekt Processes którego procesy pochodzą z nagrania """
+        return Processes(pid_source=ReplayPidSource(self), collector=ReplayCollector(self))
+
+    def _recording_time(self):
+        """ Zwraca czas w nagraniu odpowiadający bieżącej chwili """
+        return self.recording_origin + (time.monotonic() - self.clock_origin) * self.speed
+
+    def _apply_until(self, number):
+        """ Funkcja nakłada kolejne ramki aż do ramki o podanym numerze """
+        while self.position < number:
+            self.position += 1
+            frame = self.reader.read_frame(self.position)
+
+            if frame.kind == FRAME_KEY:
+                self.names = list(frame.names)
+            else:
+                self.names.extend(frame.names)
+            self.records = apply_frame(self.records, frame)
+            self.cpu_times = frame.cpu_times
+            self.cpu_ids = frame.cpu_ids
+            self.memory = frame.memory
+            self.timestamp = frame.timestamp
+
+
+class ReplayPidSource(PidSource):
+    """ Źródło numerów pid z odtwarzanego nagrania, przy każdym odczycie nagranie jest przesuwane do bieżącego czasu """
+
+    def __init__(self, replay):
+        self.replay = replay
+
+    def list_pids(self):
+        self.replay.advance()
+        return self.replay.records['pid'].tolist()
+
+
+class ReplayCollector(SerialCollector):
+    """ Sposób zbierania danych tworzący obiekty procesów z rekordów nagrania zamiast z plików w /proc.
+        Plik stat jest odtwarzany z zapisanych pól, więc procesy z nagrania niczym nie różnią się od odczytanych na żywo """
+
+    # Indeksy pól rekordu i pól pliku stat
+    FIELDS = {name: index for index, name in enumerate(RECORD_DTYPE.names)}
+    STAT_INDEXES = {key: index - 2 for index, key in enumerate(STAT_KEYS) if index >= 2}
+
+    def __init__(self, replay):
+        SerialCollector.__init__(self)
+        self.replay = replay
+
+    def collect(self, items, plan):
+        """ Funkcja zwraca wyniki w postaci takiej jak refresh_process, plan jest pomijany - dostępne są tylko nagrane dane """
+        start = time.perf_counter()
+        records, names = self.replay.records, self.replay.names
+        rows = dict(zip(records['pid'].tolist(), records.tolist()))
+
+        results = []
+        for pid, proc in items:
+            values = rows.get(pid)
+            results.append(self._refresh(pid, proc, values, names) if values is not None else (None, REFRESH_GONE))
+
+        self.last_stats = CollectionStats(len(items), 1, time.perf_counter() - start, 0.0)
+        return results
+
+    def _refresh(self, pid, proc, values, names):
+        """ Odpowiednik refresh_process dla rekordu z nagrania """
+        fields = self.FIELDS
+        line = self._stat_line(pid, values, names)
+        statm = {key: values[fields['statm_' + key]] for key in STATM_KEYS}
+        statm = statm if any(statm.values()) else None
+        uid = values[fields['uid']]
+        owner = (uid, USER_NAMES.get(uid))
+
+        if proc is not None and proc.stat.starttime == values[fields['starttime']]:
+            if proc.stat.matches(line):
+                return proc, REFRESH_UNCHANGED
+            proc.stat = ProcessStat(line)
+            proc.statm = statm
+            proc.owner = owner
+            return proc, REFRESH_CHANGED
+
+        new_proc = Process.__new__(Process)
+        new_proc.__setstate__((pid, (ProcessStat(line), statm, None, None, None, owner, None)))
+        return new_proc, REFRESH_ADDED if proc is None else REFRESH_REPLACED
+
+    def _stat_line(self, pid, values, names):
+        """ Funkcja odtwarza zawartość pliku stat (bajty) z pól rekordu, pola które nie są nagrywane mają wartość 0 """
+        fields = self.FIELDS
+        tokens = ['0'] * (len(STAT_KEYS) - 2)
+        tokens[0] = values[fields['state']].decode('ascii')
+        for key in STAT_EAGER_KEYS:
+            tokens[self.STAT_INDEXES[key]] = str(values[fields[key]])
+        return ('%d (%s) %s' % (pid, names[values[fields['comm_id']]], ' '.join(tokens))).encode()
@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
 
+from collections.abc import Mapping
+import aio
+import procfs
+
 # Nazwy pól odpowiadające kolejnym tokenom z pliku proc/loadavg, szczegóły w man proc
 AVGLOAD_KEYS = ('cpu_use_1', 'cpu_use_5', 'cpu_use_15', 'exec_threads', 'max_exec_threads', 'last_created_pid')
 
@@ -9,41 +13,71 @@ STAT_CPU_KEYS = ('user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', '
 
 def get_avgload():
     """ Funkcja zwraca listę ze średnim zużyciem procesora w ciągu ostatnich 1, 5, 15 minut  """
+    return parse_avgload(procfs.reader().read('/proc/loadavg', single=True))
 
-    # Odczytanie zawartości pliku avgload
-    with open('/proc/loadavg', 'r') as file:
-        content = file.readline()
 
-    # Tokenizujemy. Tokeny są rozdzielone za pomocą ukośnika lub spacji, więc zamieniamy wszystkie ukośniki na spacji by to ujednolicić
-    content = content.strip()
-    content = content.replace('/', ' ')
-    tokens = content.split(' ')
+def parse_avgload(content):
+    """ Funkcja zamienia zawartość pliku /proc/loadavg na słownik z napisami """
 
-    # Zamiana łańcuchów znaków na odpowiedni typ
+    # Tokenizujemy. Tokeny są rozdzielone za pomocą ukośnika lub spacji, więc zamieniamy wszystkie ukośniki na spacji by to ujednolicić
+    tokens = bytes(content).replace(b'/', b' ').decode('ascii').split()
     return dict(zip(AVGLOAD_KEYS, tokens))
 
 
-def get_memory_info():
-    """ Funkcja zwraca słownik z informacjami na temat pamięci ram """
+def get_memory_info(keys=None):
+    """ Funkcja zwraca słownik z informacjami na temat pamięci ram, wartości w kilobajtach. Gdy podano keys,
+        zwracane są tylko te klucze (brakujących w pliku nie ma w słowniku) """
+    return procfs.parse_key_values(bytes(procfs.reader().read('/proc/meminfo', single=True)), keys)
+
+
+class ProcSampler:
+    """ Źródło próbek z systemowych plików /proc/stat, /proc/meminfo i /proc/loadavg. Pliki są otwierane przy pierwszym
+        odczycie i pozostają otwarte, a kolejne próbki czytane są przez procfs.ProcFile jednym wywołaniem systemowym
+        do bufora wielokrotnego użytku. Funkcje mają te same wyniki co get_cpus_times, get_memory_info i get_avgload.
+        Obiekt używany jest przez jeden wątek """
+
+    def __init__(self):
+        self.files = {}
+
+    def __repr__(self):
+        return "ProcSampler[%s]" % ', '.join(sorted(self.files))
+
+    def get_cpus_times(self):
+        """ Odpowiednik get_cpus_times """
+        return parse_cpus_times(self._read('/proc/stat'))
+
+    def get_memory_info(self, keys=None):
+        """ Odpowiednik get_memory_info, parsowanie kończy się po znalezieniu wszystkich kluczy keys """
+        return procfs.parse_key_values(bytes(self._read('/proc/meminfo')), keys)
 
-    # Słownik który jest dalej uzupełniany
-    memory_data = {}
+    def get_avgload(self):
+        """ Odpowiednik get_avgload """
+        return parse_avgload(self._read('/proc/loadavg'))
 
-    # Odczytanie zawartości pliku meminfo
-    with open('/proc/meminfo', 'r') as file:
-        lines = file.readlines()
+    def close(self):
+        """ Zamyka otwarte pliki """
+        for file in self.files.values():
+            file.close()
+        self.files.clear()
 
-        for line in lines:
-            tokens = line.split(' ')
+    def _read(self, path):
+        """ Zwraca aktualną zawartość pliku, otwierając go przy pierwszym odczycie """
+        file = self.files.get(path)
+        if file is None:
+            file = self.files[path] = procfs.ProcFile(path)
+        return file.read()
 
-            # Pozostawienie tokenów które nie mają długości 0
-            tokens = [token for token in tokens if token]
 
-            key, value = tokens[0:2]
-            key = key.rstrip(':')
-            memory_data[key] = int(value)
+async def aget_avgload(runner=None):
+    """ Asynchroniczna wersja get_avgload, odczyt wykonywany jest w puli wątków """
+    runner = runner if runner is not None else aio.default_runner
+    return await runner.run(get_avgload)
 
-    return memory_data
+
+async def aget_memory_info(keys=None, runner=None):
+    """ Asynchroniczna wersja get_memory_info, odczyt wykonywany jest w puli wątków """
+    runner = runner if runner is not None else aio.default_runner
+    return await runner.run(get_memory_info, keys)
 
 
 def convert_bytes_to_readable_form(bytes):
@@ -60,67 +94,225 @@ def convert_bytes_to_readable_form(bytes):
 
 
 def get_cpus_times():
-    """ Funkcja zwraca krotkę słowników, po jednym słowniku na każdy procesor, zawierające na co procesor stracił czas """
+    """ Funkcja zwraca obiekt CpuTimes z czasami procesorów, zachowujący się jak lista słowników - po jednym na każdy
+        procesor, zawierających na co procesor stracił czas """
+    return parse_cpus_times(procfs.reader().read('/proc/stat', single=True))
 
-    cpus = []
 
-    with open('/proc/stat', 'r') as file:
-        while True:
-            line = file.readline().strip()
+def parse_cpus_times(content):
+    """ Funkcja zamienia zawartość pliku /proc/stat na CpuTimes, pierwszy wiersz to suma wszystkich procesorów """
+    import numpy as np
 
-            # Jeśli odczytano już informacje o wszystkich procesorach
-            if not line.startswith('cpu'):
-                break
+    # Wiersze procesorów są na początku pliku, dalszej części nie trzeba dzielić na wiersze
+    content = bytes(content)
+    end = content.find(b'\nintr')
+    block = content[:end if end >= 0 else len(content)]
+    lines = block.count(b'\n') + 1
 
-            tokens = line.split(' ')
-            tokens = [int(token) for token in tokens[1:] if token]
-            cpu = dict(zip(STAT_CPU_KEYS, tokens))
-            cpus.append(cpu)
+    # Wszystkie wiersze procesorów mają tyle samo kolumn, więc tokeny całego bloku to tablica wiersze x (nazwa, liczniki)
+    tokens = block.split()
+    width = len(tokens) // lines
+    if width < 2 or len(tokens) != lines * width or not all(label.startswith(b'cpu') for label in tokens[::width]):
+        return _parse_cpus_lines(block)
+    labels = tokens[::width]
+    del tokens[::width]
+    counters = np.fromstring(b' '.join(tokens), dtype=np.int64, sep=' ').reshape(lines, width - 1)
+    return CpuTimes(_cpu_ids(labels), _fit_columns(counters))
 
-    return cpus
 
+def _parse_cpus_lines(block):
+    """ Wolniejsze parsowanie wiersz po wierszu, gdy za wierszami procesorów są inne (starsze jądra nie mają wiersza intr
+        zaraz po nich) """
+    import numpy as np
 
-class CpuTracker:
-    """ Klasa odpowiedzialna za śledzenie obciążenia procesora """
+    labels, rows = [], []
+    for line in block.splitlines():
+        # Jeśli odczytano już informacje o wszystkich procesorach
+        if not line.startswith(b'cpu'):
+            break
+        tokens = line.split()
+        labels.append(tokens[0])
+        rows.append([int(token) for token in tokens[1:len(STAT_CPU_KEYS) + 1]])
 
-    def __init__(self):
-        """ Konstruktor obiektu śledzącego obiążenie procesora """
-        self.previous_times = None
+    counters = np.zeros((len(rows), len(STAT_CPU_KEYS)), dtype=np.int64)
+    for row, values in enumerate(rows):
+        counters[row, :len(values)] = values
+    return CpuTimes(_cpu_ids(labels), counters)
 
-    def update(self):
-        """ Funkcja pobiera czasy procesorów, obliczna obiążenia jeśli już może i je zwraca w postaci słownika """
 
-        current_times = get_cpus_times()
+def _cpu_ids(labels):
+    """ Zamienia nazwy wierszy (cpu, cpu0, cpu1...) na numery procesorów, suma wszystkich ma numer -1 """
+    return tuple(int(label[3:]) if len(label) > 3 else -1 for label in labels)
 
-        # Sprawdzenie czy można obliczyć obciążenia
-        if self.previous_times is None:
-            self.previous_times = current_times
-            return None
 
-        cpus_count = len(current_times)
-        cpus = []
+def _fit_columns(counters):
+    """ Dopasowuje liczbę kolumn do STAT_CPU_KEYS - starsze jądra mają mniej liczników, nowsze mogą mieć więcej """
+    import numpy as np
 
-        for cpu in range(cpus_count):
-            previous_total = sum(self.previous_times[cpu].values())
-            current_total = sum(current_times[cpu].values())
+    columns = len(STAT_CPU_KEYS)
+    if counters.shape[1] == columns:
+        return counters
+    fitted = np.zeros((len(counters), columns), dtype=np.int64)
+    fitted[:, :min(columns, counters.shape[1])] = counters[:, :columns]
+    return fitted
 
-            loads = {}
 
-            for key in current_times[cpu]:
-                if current_total - previous_total == 0:
-                    return None
-                loads[key] = (current_times[cpu][key] - self.previous_times[cpu][key]) / (current_total - previous_total)
-            loads['load'] = 1-loads['idle']
-            cpus.append(loads)
+class CpuTimes:
+    """ Czasy procesorów z /proc/stat - counters to tablica int64 o kształcie (wiersze, STAT_CPU_KEYS), a ids to numery
+        procesorów kolejnych wierszy, pierwszy wiersz (-1) to suma wszystkich. Numery nie muszą być kolejne, bo wyłączone
+        procesory nie mają wierszy w /proc/stat. Dla zgodności obiekt zachowuje się jak lista słowników klucz: licznik """
 
-        self.previous_times = current_times
-        return cpus
+    __slots__ = ('ids', 'counters')
+
+    def __init__(self, ids, counters):
+        self.ids = tuple(ids)
+        self.counters = counters
+
+    def __repr__(self):
+        return "CpuTimes[cpus: %d]" % (len(self.ids) - 1)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        return dict(zip(STAT_CPU_KEYS, self.counters[row].tolist()))
+
+    def __iter__(self):
+        return (dict(zip(STAT_CPU_KEYS, row)) for row in self.counters.tolist())
+
+    @classmethod
+    def from_dicts(cls, cpus, ids=None):
+        """ Tworzy obiekt z listy słowników, np. z nagrania. Bez ids procesory są numerowane kolejno """
+        import numpy as np
+
+        counters = np.array([[cpu.get(key, 0) for key in STAT_CPU_KEYS] for cpu in cpus], dtype=np.int64)
+        return cls(ids if ids is not None else range(-1, len(cpus) - 1), counters.reshape(len(cpus), len(STAT_CPU_KEYS)))
+
+
+async def aget_cpus_times(runner=None):
+    """ Asynchroniczna wersja get_cpus_times, odczyt wykonywany jest w puli wątków """
+    runner = runner if runner is not None else aio.default_runner
+    return await runner.run(get_cpus_times)
+
+
+# Wartości obliczane przez CpuTracker dla każdego procesora - ułamki czasu poszczególnych stanów i łączne obciążenie
+CPU_LOAD_KEYS = STAT_CPU_KEYS + ('load',)
+CPU_LOAD_INDEXES = {key: index for index, key in enumerate(CPU_LOAD_KEYS)}
 
 
+class CpuLoads:
+    """ Obciążenia procesorów obliczone przez CpuTracker - fractions to tablica o kształcie (wiersze, CPU_LOAD_KEYS),
+        a ids to numery procesorów tak jak w CpuTimes. Indeksowanie zwraca widok wiersza zachowujący się jak słownik,
+        więc loads[0]['load'] działa tak jak dla poprzedniej listy słowników """
 
+    __slots__ = ('ids', 'fractions')
 
+    def __init__(self, ids, fractions):
+        self.ids = ids
+        self.fractions = fractions
 
+    def __repr__(self):
+        return "CpuLoads[cpus: %d, load: %.2f]" % (len(self.ids) - 1, self.fractions[0, -1])
 
+    def __len__(self):
+        return len(self.ids)
 
+    def __getitem__(self, row):
+        if not -len(self.ids) <= row < len(self.ids):
+            raise IndexError(row)
+        return CpuLoadsRow(self.fractions, row)
 
+    def __iter__(self):
+        return (CpuLoadsRow(self.fractions, row) for row in range(len(self.ids)))
 
+    def column(self, key):
+        """ Zwraca tablicę wartości klucza dla wszystkich wierszy """
+        return self.fractions[:, CPU_LOAD_INDEXES[key]]
+
+    def names(self):
+        """ Zwraca nazwy wierszy: total dla sumy i cpuN dla procesorów """
+        return ['total' if cpu < 0 else 'cpu%d' % cpu for cpu in self.ids]
+
+
+class CpuLoadsRow(Mapping):
+    """ Widok jednego wiersza CpuLoads jako słownik tylko do odczytu, wartości odczytywane są z tablicy bez kopiowania """
+
+    __slots__ = ('fractions', 'row')
+
+    def __init__(self, fractions, row):
+        self.fractions = fractions
+        self.row = row
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __getitem__(self, key):
+        return float(self.fractions[self.row, CPU_LOAD_INDEXES[key]])
+
+    def __iter__(self):
+        return iter(CPU_LOAD_KEYS)
+
+    def __len__(self):
+        return len(CPU_LOAD_KEYS)
+
+
+class CpuTracker:
+    """ Klasa odpowiedzialna za śledzenie obciążenia procesora. Liczniki wszystkich procesorów trzymane są w tablicy,
+        a obciążenia obliczane jedną operacją na całej tablicy, co przy setkach rdzeni zastępuje pętle po słownikach """
+
+    def __init__(self):
+        """ Konstruktor obiektu śledzącego obiążenie procesora """
+        self.previous_times = None
+
+    def update(self):
+        """ Funkcja pobiera czasy procesorów, obliczna obiążenia jeśli już może i je zwraca jako CpuLoads """
+        return self.update_with(get_cpus_times())
+
+    async def aupdate(self, runner=None):
+        """ Asynchroniczna wersja update, odczyt pliku /proc/stat wykonywany jest w puli wątków """
+        return self.update_with(await aget_cpus_times(runner))
+
+    def update_with(self, current_times):
+        """ Funkcja oblicza obciążenia na podstawie przekazanych czasów procesorów odczytanych przez get_cpus_times
+            (CpuTimes lub lista słowników). Gdy od poprzedniego odczytu nie minął żaden czas zwraca None """
+        import numpy as np
+
+        if not isinstance(current_times, CpuTimes):
+            current_times = CpuTimes.from_dicts(current_times)
+
+        # Sprawdzenie czy można obliczyć obciążenia
+        if self.previous_times is None:
+            self.previous_times = current_times
+            return None
+
+        current = current_times.counters
+        previous = self._previous_counters(current_times)
+        delta = current - previous
+        # Liczniki procesora włączonego ponownie mogą zacząć od mniejszych wartości
+        np.maximum(delta, 0, out=delta)
+        total = delta.sum(axis=1)
+        if not len(total) or total[0] == 0:
+            return None
+
+        # Wiersze bez przyrostu (np. procesor dopiero co włączony) mają zerowe obciążenie
+        fractions = np.zeros((len(current), len(CPU_LOAD_KEYS)))
+        busy = total > 0
+        fractions[busy, :-1] = delta[busy] / total[busy, None]
+        fractions[busy, -1] = 1 - fractions[busy, CPU_LOAD_INDEXES['idle']]
+
+        self.previous_times = current_times
+        return CpuLoads(current_times.ids, fractions)
+
+    def _previous_counters(self, current_times):
+        """ Zwraca poprzednie liczniki ułożone tak jak bieżące wiersze. Po zmianie zbioru procesorów (hotplug) wiersze
+            dopasowywane są po numerach procesorów, a procesory których wcześniej nie było dostają bieżące liczniki """
+        previous_times = self.previous_times
+        if previous_times.ids == current_times.ids:
+            return previous_times.counters
+
+        counters = current_times.counters.copy()
+        rows = {cpu: row for row, cpu in enumerate(previous_times.ids)}
+        for row, cpu in enumerate(current_times.ids):
+            if cpu in rows:
+                counters[row] = previous_times.counters[rows[cpu]]
+        return counters
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+import traceback
+from collections import deque
+
+
+class ScheduledTask:
+    """ Zadanie wykonywane cyklicznie przez Scheduler wraz ze statystykami czasu wykonania """
+
+    # Waga najnowszego pomiaru w średniej czasu wykonania
+    SMOOTHING = 0.3
+
+    # Jeśli zadanie trwa dłużej niż jego okres, to okres jest wydłużany do średniego czasu wykonania razy ten współczynnik
+    BACKOFF = 1.5
+
+    def __init__(self, name, func, period):
+        """ Funkcja zapamiętuje nazwę, funkcję i żądany okres w sekundach, okres 0 oznacza zadanie wstrzymane """
+        self.name = name
+        self.func = func
+        self.period = period
+        self.effective_period = period
+        self.next_run = 0.0
+        self.last_duration = 0.0
+        self.average_duration = 0.0
+        self.runs = 0
+
+    def __repr__(self):
+        return "ScheduledTask[%s, period: %.2f s, effective: %.2f s, average: %.4f s]" % (self.name, self.period, self.effective_period, self.average_duration)
+
+    def run(self):
+        """ Funkcja wykonuje zadanie, mierzy czas i dostosowuje rzeczywisty okres do obciążenia """
+        start = time.monotonic()
+        try:
+            self.func()
+        finally:
+            self.last_duration = time.monotonic() - start
+            if self.runs:
+                self.average_duration += self.SMOOTHING * (self.last_duration - self.average_duration)
+            else:
+                self.average_duration = self.last_duration
+            self.runs += 1
+
+            if self.average_duration > self.period:
+                self.effective_period = self.average_duration * self.BACKOFF
+            else:
+                self.effective_period = self.period
+            self.next_run = start + self.effective_period
+
+
+class Scheduler(threading.Thread):
+    """ Wątek wykonujący zadania zbierające dane, każde z własnym okresem. Zadania nie nakładają się na siebie,
+        a ręczne żądania odświeżenia są wykonywane w tym samym wątku co zadania cykliczne """
+
+    def __init__(self):
+        threading.Thread.__init__(self, daemon=True)
+        self.tasks = {}
+        self.requests = deque()
+        self.paused = False
+        self.stopped = False
+        self.condition = threading.Condition()
+
+    def add_task(self, name, func, period):
+        """ Funkcja dodaje zadanie o podanej nazwie wykonywane co period sekund """
+        with self.condition:
+            self.tasks[name] = ScheduledTask(name, func, period)
+            self.condition.notify()
+
+    def set_period(self, name, period):
+        """ Funkcja zmienia okres zadania, okres 0 wstrzymuje zadanie """
+        with self.condition:
+            task = self.tasks[name]
+            task.period = period
+            task.effective_period = max(period, task.effective_period) if task.average_duration > period else period
+            task.next_run = time.monotonic()
+            self.condition.notify()
+
+    def pause(self):
+        """ Funkcja wstrzymuje wszystkie zadania cykliczne, ręczne żądania są nadal wykonywane """
+        with self.condition:
+            self.paused = True
+
+    def resume(self):
+        """ Funkcja wznawia zadania cykliczne """
+        with self.condition:
+            self.paused = False
+            self.condition.notify()
+
+    def request(self, *names):
+        """ Funkcja zleca jak najszybsze wykonanie podanych zadań, bez nazw - wszystkich zadań """
+        with self.condition:
+            for name in names or tuple(self.tasks):
+                if name in self.tasks and name not in self.requests:
+                    self.requests.append(name)
+            self.condition.notify()
+
+    def stop(self):
+        """ Funkcja kończy pracę wątku po zakończeniu bieżącego zadania """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def run(self):
+        """ Pętla wybierająca kolejne zadanie do wykonania """
+        while True:
+            with self.condition:
+                task = self._next_task()
+                while task is None and not self.stopped:
+                    self.condition.wait(self._time_to_next_task())
+                    task = self._next_task()
+                if self.stopped:
+                    return
+
+            # Błąd w jednym zadaniu nie może zatrzymać odświeżania pozostałych
+            try:
+                task.run()
+            except Exception:
+                traceback.print_exc()
+
+    def _next_task(self):
+        """ Zwraca zadanie które należy teraz wykonać lub None, najpierw obsługiwane są ręczne żądania """
+        if self.requests:
+            return self.tasks.get(self.requests.popleft())
+        if self.paused:
+            return None
+
+        now = time.monotonic()
+        due = [task for task in self.tasks.values() if task.period > 0 and task.next_run <= now]
+        if not due:
+            return None
+        return min(due, key=lambda task: task.next_run)
+
+    def _time_to_next_task(self):
+        """ Zwraca czas do najbliższego zadania lub None jeżeli nie ma na co czekać """
+        if self.paused:
+            return None
+        next_runs = [task.next_run for task in self.tasks.values() if task.period > 0]
+        if not next_runs:
+            return None
+        return max(0.0, min(next_runs) - time.monotonic())
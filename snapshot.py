@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+from types import MappingProxyType
+import numpy as np
+from processes import STAT_EAGER_KEYS, STATM_KEYS, IO_KEYS, Process
+
+# Liczba taktów zegara na sekundę w jakich podawane są czasy utime i stime oraz rozmiar strony pamięci
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+# Numery pid są mniejsze niż 2^22 (PID_MAX_LIMIT), więc para (pid, starttime) mieści się w jednej liczbie int64
+PID_BITS = 22
+
+# Kolumny liczbowe tabeli procesów, wszystkie przechowywane jako int64
+PROCESS_TABLE_COLUMNS = ('pid',) + STAT_EAGER_KEYS + tuple('statm_' + key for key in STATM_KEYS) + ('uid',)
+
+# Kolumny z licznikami z pliku /proc/pid/io, obecne w tabeli tylko gdy zostały zebrane
+IO_TABLE_COLUMNS = tuple('io_' + key for key in IO_KEYS)
+
+# Liczniki z których ProcessIoTracker oblicza prędkości
+IO_RATE_KEYS = ('read_bytes', 'write_bytes', 'syscr', 'syscw')
+
+
+class ProcessTable:
+    """ Kolumnowa migawka wszystkich procesów - po jednej ciągłej tablicy NumPy na każde pole liczbowe
+        oraz kolumna nazw zapisana jako kody odwołujące się do listy unikalnych nazw """
+
+    def __init__(self, columns, comm_codes, comm_names, state):
+        """ Funkcja zapisuje przekazane kolumny i blokuje możliwość ich modyfikacji """
+        self.columns = columns
+        self.comm_codes = comm_codes
+        self.comm_names = comm_names
+        self.state = state
+
+        for array in (*self.columns.values(), self.comm_codes, self.state):
+            array.flags.writeable = False
+
+    @classmethod
+    def from_processes(cls, processes, with_statm=False, with_owner=False, with_io=False):
+        """ Funkcja tworzy tabelę z obiektu Processes. Kolumny z pliku statm i uid są wypełniane
+            tylko na życzenie, bo mogą wymagać odczytania dodatkowych plików, w przeciwnym razie zawierają zera.
+            Kolumny IO_TABLE_COLUMNS są dodawane tylko na życzenie, z danych zebranych według planu.
+            Dane odczytane już zgodnie z planem zbierania są wykorzystywane bez ponownego odczytu """
+
+        procs = processes.all
+        count = len(procs)
+        columns = {name: np.zeros(count, dtype=np.int64) for name in PROCESS_TABLE_COLUMNS}
+
+        # Kolumny z pliku stat przepisujemy jedna po drugiej, fromiter nie tworzy pośrednich list
+        columns['pid'][:] = np.fromiter((proc.pid for proc in procs), dtype=np.int64, count=count)
+        for key in STAT_EAGER_KEYS:
+            columns[key][:] = np.fromiter((getattr(proc.stat, key) for proc in procs), dtype=np.int64, count=count)
+
+        if with_statm:
+            for row, proc in enumerate(procs):
+                try:
+                    memory = proc.statm if proc.statm is not None else proc.read_memory_usage_data()
+                except (FileNotFoundError, ProcessLookupError):
+                    continue
+                for key in STATM_KEYS:
+                    columns['statm_' + key][row] = memory[key]
+
+        if with_owner:
+            owners = (proc.owner if proc.owner is not None else proc.get_owner() for proc in procs)
+            columns['uid'][:] = np.fromiter((owner[0] for owner in owners), dtype=np.int64, count=count)
+
+        if with_io:
+            # Plik io może odczytać tylko właściciel procesu, procesy bez odczytanych liczników mają w kolumnach -1
+            ios = [proc.io for proc in procs]
+            for key in IO_KEYS:
+                columns['io_' + key] = np.fromiter((io.get(key, 0) if io is not None else -1 for io in ios),
+                                                   dtype=np.int64, count=count)
+
+        # Nazwy procesów często się powtarzają, więc przechowujemy je jako kody
+        codes = {}
+        comm_codes = np.fromiter((codes.setdefault(proc.stat.comm, len(codes)) for proc in procs), dtype=np.int32, count=count)
+        comm_names = tuple(codes)
+
+        state = np.array([proc.stat.state for proc in procs], dtype='U1')
+        return cls(columns, comm_codes, comm_names, state)
+
+    def __len__(self):
+        """ Liczba procesów w tabeli """
+        return len(self.comm_codes)
+
+    def __getitem__(self, name):
+        """ Zwraca kolumnę o podanej nazwie """
+        if name == 'comm':
+            return self.comm
+        if name == 'state':
+            return self.state
+        return self.columns[name]
+
+    def __repr__(self):
+        return "ProcessTable[rows: %d, columns: %d]" % (len(self), len(self.columns))
+
+    @property
+    def comm(self):
+        """ Kolumna nazw procesów w postaci tablicy obiektów """
+        return np.array(self.comm_names, dtype=object)[self.comm_codes]
+
+    def take(self, indexes):
+        """ Zwraca nową tabelę zawierającą tylko wiersze o podanych indeksach lub wybrane maską logiczną """
+        columns = {name: array[indexes] for name, array in self.columns.items()}
+        return ProcessTable(columns, self.comm_codes[indexes], self.comm_names, self.state[indexes])
+
+    def argsort(self, column, descending=False):
+        """ Zwraca indeksy wierszy posortowanych według podanej kolumny """
+        order = np.argsort(self[column], kind='stable')
+        return order[::-1] if descending else order
+
+    def top(self, column, count):
+        """ Zwraca indeksy count wierszy o największych wartościach w kolumnie, posortowane malejąco """
+        return top_indexes(self[column], count)
+
+    def group_sum(self, by, column):
+        """ Zwraca parę tablic (klucze, sumy) - sumę kolumny column dla każdej wartości kolumny by,
+            np. group_sum('uid', 'rss') lub group_sum('session', 'utime') """
+        if by == 'comm':
+            keys, inverse = np.array(self.comm_names, dtype=object), self.comm_codes
+        else:
+            keys, inverse = np.unique(self[by], return_inverse=True)
+        sums = np.bincount(inverse.ravel(), weights=self[column], minlength=len(keys))
+        return keys, sums.astype(np.int64)
+
+
+def top_indexes(values, count):
+    """ Zwraca indeksy count największych wartości tablicy, posortowane malejąco """
+    count = min(count, len(values))
+    if count == 0:
+        return np.empty(0, dtype=np.intp)
+
+    # argpartition wybiera największe elementy w czasie liniowym, sortujemy tylko wybrane
+    candidates = np.argpartition(values, len(values) - count)[len(values) - count:]
+    return candidates[np.argsort(values[candidates])[::-1]]
+
+
+def match_keys(previous_keys, keys):
+    """ Dopasowuje procesy do poprzedniego odczytu przez wyszukiwanie binarne w posortowanych kluczach previous_keys.
+        Zwraca parę (maska procesów które istniały poprzednio, ich pozycje w previous_keys) """
+    positions = np.searchsorted(previous_keys, keys)
+    positions[positions == len(previous_keys)] = 0
+    matched = previous_keys[positions] == keys
+    return matched, positions[matched]
+
+
+def identity_keys(table):
+    """ Funkcja zwraca tablicę kluczy jednoznacznie identyfikujących procesy tabeli, odpowiednik Process.get_identity """
+    return (table['starttime'] << PID_BITS) | table['pid']
+
+
+class ProcessUsage:
+    """ Wynik śledzenia zużycia zasobów przez procesy - tablice wyrównane z wierszami tabeli ProcessTable """
+
+    def __init__(self, pid, cpu_percent, rss_bytes):
+        """ Funkcja zapisuje przekazane kolumny """
+        self.pid = pid
+        self.cpu_percent = cpu_percent
+        self.rss_bytes = rss_bytes
+
+    def __len__(self):
+        return len(self.pid)
+
+    def __repr__(self):
+        return "ProcessUsage[rows: %d, cpu total: %.1f%%]" % (len(self), self.cpu_percent.sum())
+
+    def by_pid(self):
+        """ Zwraca słownik pid: (procent cpu, zajęta pamięć w bajtach) do wyszukiwania pojedynczych procesów """
+        return dict(zip(self.pid.tolist(), zip(self.cpu_percent.tolist(), self.rss_bytes.tolist())))
+
+
+class ProcessCpuTracker:
+    """ Klasa śledząca zużycie procesora przez poszczególne procesy na podstawie przyrostów utime i stime.
+        Poprzednie wartości zapamiętywane są dla par (pid, starttime), a obliczenia wykonywane są dla wszystkich procesów naraz """
+
+    def __init__(self):
+        """ Konstruktor obiektu śledzącego, pierwsza aktualizacja zwraca zerowe zużycie procesora """
+        self.previous_keys = None
+        self.previous_ticks = None
+        self.previous_time = None
+
+    def update(self, table, timestamp=None):
+        """ Funkcja przyjmuje tabelę ProcessTable i zwraca obiekt ProcessUsage z procentowym zużyciem procesora
+            (100% to jeden w pełni wykorzystany rdzeń) i zajętą pamięcią RSS """
+
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        keys = identity_keys(table)
+        ticks = table['utime'] + table['stime']
+        cpu_percent = np.zeros(len(table), dtype=np.float64)
+
+        if self.previous_keys is not None and timestamp > self.previous_time and len(self.previous_keys):
+            matched, positions = match_keys(self.previous_keys, keys)
+            elapsed_ticks = (timestamp - self.previous_time) * CLOCK_TICKS
+            delta = ticks[matched] - self.previous_ticks[positions]
+            cpu_percent[matched] = np.maximum(delta, 0) / elapsed_ticks * 100
+
+        order = np.argsort(keys)
+        self.previous_keys = keys[order]
+        self.previous_ticks = ticks[order]
+        self.previous_time = timestamp
+
+        return ProcessUsage(table['pid'], cpu_percent, table['rss'] * PAGE_SIZE)
+
+
+class ProcessIoUsage:
+    """ Prędkości operacji wejścia/wyjścia procesów - tablice wyrównane z wierszami tabeli ProcessTable, bajty przeczytane
+        i zapisane na urządzeniu blokowym oraz wywołania systemowe odczytu i zapisu na sekundę """
+
+    def __init__(self, pid, read_bytes, write_bytes, syscr, syscw):
+        """ Funkcja zapisuje przekazane kolumny """
+        self.pid = pid
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+        self.syscr = syscr
+        self.syscw = syscw
+
+    def __len__(self):
+        return len(self.pid)
+
+    def __repr__(self):
+        return "ProcessIoUsage[rows: %d, read: %.0f B/s, write: %.0f B/s]" % (len(self), self.read_bytes.sum(), self.write_bytes.sum())
+
+    def top(self, count):
+        """ Zwraca indeksy count procesów które najwięcej czytają i zapisują na dysku, posortowane malejąco """
+        return top_indexes(self.read_bytes + self.write_bytes, count)
+
+    def by_pid(self):
+        """ Zwraca słownik pid: (bajty przeczytane, bajty zapisane, wywołania systemowe na sekundę),
+            tylko dla procesów które wykonywały operacje - pozostałe mają same zera """
+        syscalls = self.syscr + self.syscw
+        active = np.flatnonzero((self.read_bytes > 0) | (self.write_bytes > 0) | (syscalls > 0))
+        return dict(zip(self.pid[active].tolist(), zip(self.read_bytes[active].tolist(), self.write_bytes[active].tolist(),
+                                                       syscalls[active].tolist())))
+
+
+class ProcessIoTracker:
+    """ Klasa śledząca operacje wejścia/wyjścia procesów na podstawie przyrostów liczników z pliku /proc/pid/io.
+        Tak jak ProcessCpuTracker dopasowuje procesy do poprzedniego odczytu przez pary (pid, starttime)
+        i oblicza prędkości dla wszystkich procesów naraz """
+
+    def __init__(self):
+        """ Konstruktor obiektu śledzącego, pierwsza aktualizacja zwraca zerowe prędkości """
+        self.reset()
+
+    def reset(self):
+        """ Zapomina poprzedni odczyt, kolejna aktualizacja zwróci zerowe prędkości """
+        self.previous_keys = None
+        self.previous_counters = None
+        self.previous_time = None
+
+    def update(self, table, timestamp=None):
+        """ Funkcja przyjmuje tabelę ProcessTable z kolumnami IO_TABLE_COLUMNS i zwraca obiekt ProcessIoUsage. Procesy
+            bez poprzedniego odczytu lub z niedostępnym plikiem io w którymkolwiek z odczytów mają zerowe prędkości """
+
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        keys = identity_keys(table)
+        counters = np.stack([table['io_' + key] for key in IO_RATE_KEYS])
+        rates = np.zeros(counters.shape, dtype=np.float64)
+
+        if self.previous_keys is not None and timestamp > self.previous_time and len(self.previous_keys):
+            matched, positions = match_keys(self.previous_keys, keys)
+            current = counters[:, matched]
+            previous = self.previous_counters[:, positions]
+            readable = (current[0] >= 0) & (previous[0] >= 0)
+            delta = np.maximum(current - previous, 0) * readable
+            rates[:, matched] = delta / (timestamp - self.previous_time)
+
+        order = np.argsort(keys)
+        self.previous_keys = keys[order]
+        self.previous_counters = counters[:, order]
+        self.previous_time = timestamp
+
+        return ProcessIoUsage(table['pid'], *rates)
+
+
+class ProcessRecord:
+    """ Niezmienna kopia danych procesu z chwili wykonania migawki. Zamiast obiektu rodzica przechowuje jego pid,
+        więc rekordy mogą być bezpiecznie przekazywane pomiędzy wątkami """
+
+    __slots__ = ('pid', 'parent_pid') + Process.DATA_SLOTS
+
+    def __init__(self, proc, parent_pid):
+        """ Funkcja kopiuje dane z obiektu Process, pola stat i dane z planu nie są później modyfikowane w miejscu """
+        object.__setattr__(self, 'pid', proc.pid)
+        object.__setattr__(self, 'parent_pid', parent_pid)
+        for slot in Process.DATA_SLOTS:
+            object.__setattr__(self, slot, getattr(proc, slot))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ProcessRecord is immutable")
+
+    def __repr__(self):
+        return "ProcessRecord[pid: %d, parent: %s, comm: %s]" % (self.pid, self.parent_pid, self.stat.comm)
+
+    def matches(self, proc, parent_pid):
+        """ Sprawdza czy rekord zawiera aktualne dane procesu, wtedy można go użyć w kolejnej migawce """
+        if self.stat is not proc.stat or self.parent_pid != parent_pid:
+            return False
+        for slot in Process.DATA_SLOTS[1:]:
+            if getattr(self, slot) != getattr(proc, slot):
+                return False
+        return True
+
+    get_identity = Process.get_identity
+    get_readable_state = Process.get_readable_state
+    get_parent_pid = Process.get_parent_pid
+    proc_directory = Process.proc_directory
+    read_smaps_rollup = Process.read_smaps_rollup
+
+
+class SnapshotDiff:
+    """ Różnica pomiędzy dwiema migawkami - słowniki pid: rekord procesów nowych, zakończonych i zmienionych.
+        Różnice kolejnych migawek można łączyć, gdy odbiorca nie nadąża z ich przetwarzaniem """
+
+    def __init__(self, added=None, removed=None, changed=None):
+        self.added = added if added is not None else {}
+        self.removed = removed if removed is not None else {}
+        self.changed = changed if changed is not None else {}
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return "SnapshotDiff[added: %d, removed: %d, changed: %d]" % (len(self.added), len(self.removed), len(self.changed))
+
+    def merge(self, later):
+        """ Zwraca różnicę równoważną zastosowaniu najpierw tej różnicy, a potem różnicy later """
+        added, removed, changed = dict(self.added), dict(self.removed), dict(self.changed)
+
+        for pid, record in later.removed.items():
+            changed.pop(pid, None)
+            # Proces który pojawił się i zniknął pomiędzy odczytami odbiorcy nie musi być mu pokazywany,
+            # chyba że zastąpił proces o tym samym pid, który odbiorca zna - ten już jest w removed
+            if added.pop(pid, None) is None:
+                removed.setdefault(pid, record)
+
+        for pid, record in later.added.items():
+            added[pid] = record
+
+        for pid, record in later.changed.items():
+            if pid in added:
+                added[pid] = record
+            else:
+                changed[pid] = record
+
+        return SnapshotDiff(added, removed, changed)
+
+
+class ProcessesSnapshot:
+    """ Niezmienna migawka wszystkich procesów: słownik pid: ProcessRecord, zużycie zasobów, prędkości operacji
+        wejścia/wyjścia aktywnych procesów (ProcessIoUsage.by_pid) i różnica względem poprzedniej migawki """
+
+    def __init__(self, records, usage, diff, timestamp, io=None):
+        self._records = records
+        self._usage = usage
+        self._io = io if io is not None else {}
+        self.by_pid = MappingProxyType(records)
+        self.usage = MappingProxyType(usage)
+        self.io = MappingProxyType(self._io)
+        self.diff = diff
+        self.timestamp = timestamp
+
+    def __len__(self):
+        return len(self.by_pid)
+
+    def __repr__(self):
+        return "ProcessesSnapshot[processes: %d, %s]" % (len(self), self.diff)
+
+    def with_diff(self, diff):
+        """ Zwraca tę samą migawkę z inną różnicą, używane przy łączeniu pominiętych migawek """
+        return ProcessesSnapshot(self._records, self._usage, diff, self.timestamp, self._io)
+
+    @classmethod
+    def build(cls, processes, previous=None, usage=None, io=None):
+        """ Funkcja tworzy migawkę z obiektu Processes. Rekordy procesów które się nie zmieniły są brane
+            z poprzedniej migawki, a różnica jest wyznaczana na podstawie par (pid, starttime) """
+
+        previous_records = previous.by_pid if previous is not None else {}
+        records = {}
+        diff = SnapshotDiff()
+
+        for proc in processes.all:
+            parent_pid = proc.parent.pid if proc.parent is not None else None
+            record = previous_records.get(proc.pid)
+
+            if record is not None and record.matches(proc, parent_pid):
+                records[proc.pid] = record
+                continue
+
+            new_record = ProcessRecord(proc, parent_pid)
+            records[proc.pid] = new_record
+            if record is None:
+                diff.added[proc.pid] = new_record
+            elif record.get_identity() != new_record.get_identity():
+                diff.removed[proc.pid] = record
+                diff.added[proc.pid] = new_record
+            else:
+                diff.changed[proc.pid] = new_record
+
+        for pid, record in previous_records.items():
+            if pid not in records:
+                diff.removed[pid] = record
+
+        return cls(records, dict(usage) if usage is not None else {}, diff, time.time(), dict(io) if io is not None else None)
+
+
+class SnapshotMailbox:
+    """ Skrzynka przekazująca migawki z wątku zbierającego dane do odbiorcy (wątku gui). Przechowuje tylko najnowszą
+        migawkę - jeżeli odbiorca nie odebrał poprzedniej, jest ona zastępowana, a różnice są łączone """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = None
+
+    def put(self, snapshot):
+        """ Funkcja umieszcza migawkę w skrzynce, zwraca prawdę jeżeli skrzynka była pusta i trzeba powiadomić odbiorcę """
+        with self.lock:
+            if self.pending is None:
+                self.pending = snapshot
+                return True
+            self.pending = snapshot.with_diff(self.pending.diff.merge(snapshot.diff))
+            return False
+
+    def take(self):
+        """ Funkcja zwraca oczekującą migawkę lub None """
+        with self.lock:
+            snapshot, self.pending = self.pending, None
+            return snapshot
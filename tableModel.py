@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtCore import *
+
+
+class RowsTableModel(QAbstractTableModel):
+    """ Model tabeli której wiersze to niezmienne krotki zastępowane w całości przez set_rows. Przy aktualizacji widok
+        dostaje informację tylko o zmienionych, dodanych i usuniętych wierszach, więc zachowuje zaznaczenie i przewinięcie.
+        Podklasy podają nazwy kolumn w COLUMNS, a wiersze mają wartości w kolejności COLUMNS. Podklasy mogą nadpisać _cell
+        by zwracać inną parę (tekst, wartość do sortowania), jak ProcessTreeModel """
+
+    COLUMNS = []
+
+    def __init__(self):
+        """ Tworzy pusty model """
+        QAbstractTableModel.__init__(self)
+        self.rows = []
+
+    # Interfejs QAbstractTableModel
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.UserRole):
+            return None
+        text, value = self._cell(self.rows[index.row()], self.COLUMNS[index.column()])
+        return text if role == Qt.DisplayRole else value
+
+    # Aktualizacja różnicowa
+
+    def set_rows(self, rows):
+        """ Funkcja zastępuje wiersze nowymi, informując widok tylko o zmienionych, dodanych i usuniętych wierszach """
+        rows = list(rows)
+        common = min(len(rows), len(self.rows))
+
+        if len(rows) < len(self.rows):
+            self.beginRemoveRows(QModelIndex(), len(rows), len(self.rows) - 1)
+            del self.rows[len(rows):]
+            self.endRemoveRows()
+
+        for row in range(common):
+            if self.rows[row] != rows[row]:
+                self.rows[row] = rows[row]
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+
+        if len(rows) > len(self.rows):
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(rows) - 1)
+            self.rows.extend(rows[len(self.rows):])
+            self.endInsertRows()
+
+    def _cell(self, row, column):
+        """ Zwraca parę (tekst, wartość do sortowania) dla komórki wiersza w podanej kolumnie, domyślnie wartość z pozycji
+            kolumny w COLUMNS i jej tekstową postać """
+        value = row[self.COLUMNS.index(column)]
+        return str(value), value